@@ -3,9 +3,15 @@ from dotenv import load_dotenv
 import os
 import requests
 import numpy as np
+from cache import get_geocode_cache, normalize_address
 
 # --- Helpers ---
 def geocode_address(address, api_key):
+    cache = get_geocode_cache()
+    cache_key = normalize_address(address)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached[0], cached[1]
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {"address": address, "key": api_key}
     resp = requests.get(url, params=params)
@@ -13,6 +19,7 @@ def geocode_address(address, api_key):
         results = resp.json().get("results")
         if results:
             location = results[0]["geometry"]["location"]
+            cache.set(cache_key, [location["lat"], location["lng"], results[0]["formatted_address"]])
             return location["lat"], location["lng"]
     return None, None
 
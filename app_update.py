@@ -1,24 +1,39 @@
 import streamlit as st
-import requests
+import httpx
 import json
+import os
+import atexit
 from typing import List, Tuple, Optional
 
 # Configuration
 API_BASE_URL = "http://localhost:8000"  # Change this to your FastAPI server URL
 
+# A budgeted solve can run for up to a minute server-side, so reads get far longer
+# than the upstream timeouts in http_client; only connecting is kept short
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "300"))
+
+@st.cache_resource
+def get_api_client() -> httpx.Client:
+    """Keep-alive client for the API, shared across reruns of this script"""
+    client = httpx.Client(timeout=httpx.Timeout(API_READ_TIMEOUT, connect=5))
+    # Release the pooled connections when the Streamlit server exits
+    atexit.register(client.close)
+    return client
+
 def call_api(endpoint: str, method: str = "GET", data: dict = None) -> dict:
     """Make API calls to the FastAPI backend"""
     url = f"{API_BASE_URL}{endpoint}"
     
     try:
+        client = get_api_client()
         if method == "GET":
-            response = requests.get(url)
+            response = client.get(url)
         elif method == "POST":
-            response = requests.post(url, json=data)
+            response = client.post(url, json=data)
         
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         st.error(f"API Error: {str(e)}")
         return None
 
@@ -181,7 +196,10 @@ def main():
                     directions_response = call_api(
                         "/get-directions",
                         method="POST",
-                        data={"addresses": st.session_state['addresses']}
+                        data={
+                            "route_id": route_data.get('route_id'),
+                            "addresses": st.session_state['addresses']
+                        }
                     )
                     
                     if directions_response:
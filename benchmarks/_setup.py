@@ -0,0 +1,17 @@
+"""Shared benchmark setup: repository root on sys.path, throwaway caches, a dummy API key"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The repository root goes first, so service modules win over benchmark scripts of the same name
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def isolate_caches() -> None:
+    """Point every SQLite cache at a fresh temporary file so runs start cold"""
+    directory = tempfile.mkdtemp(prefix="smart-route-bench-")
+    for prefix in ("GEOCODE_CACHE", "LEG_CACHE", "ROUTE_STORE", "RESPONSE_CACHE"):
+        os.environ[f"{prefix}_PATH"] = os.path.join(directory, f"{prefix.lower()}.sqlite3")
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
@@ -0,0 +1,85 @@
+"""Cluster-first decomposition vs one full-matrix solve: route cost gap and wall time
+
+Both solvers get the same time budget on haversine x 1.3 distances, for uniform
+drops and for drops bunched around a few depots. The gap is the decomposed
+route's cost over the full solve's, right-turn penalties included.
+
+    python benchmarks/decomposition.py [--sizes 1000 2000 5000] [--time-limit-ms 10000] [--workers N]
+"""
+import argparse
+import asyncio
+import functools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import _setup  # noqa: F401
+from decomposition import solve_decomposed
+from providers import haversine_matrix
+from solver import route_cost, solve_route
+
+DETOUR_FACTOR = 1.3
+PENALTY = 500
+
+
+def instance(n, kind, rng):
+    if kind == "uniform":
+        return [(12.8 + rng.random() * 0.4, 77.4 + rng.random() * 0.4) for _ in range(n)]
+    depots = [(12.8 + rng.random() * 0.4, 77.4 + rng.random() * 0.4) for _ in range(max(3, n // 200))]
+    coords = []
+    for _ in range(n):
+        lat, lng = rng.choice(depots)
+        coords.append((lat + rng.gauss(0, 0.01), lng + rng.gauss(0, 0.01)))
+    return coords
+
+
+async def decomposed(coords, pool, workers, cluster_max_stops, time_limit_ms):
+    loop = asyncio.get_running_loop()
+
+    async def run_solver(func, *args, **kwargs):
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+
+    async def get_matrix(sub_coords):
+        return haversine_matrix(sub_coords, DETOUR_FACTOR)
+
+    order, _ = await solve_decomposed(
+        coords, cluster_max_stops, get_matrix, run_solver, workers,
+        right_turn_penalty=PENALTY, time_limit_ms=time_limit_ms
+    )
+    return order
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=(1000, 2000, 5000))
+    parser.add_argument("--time-limit-ms", type=float, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cluster-max-stops", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with ProcessPoolExecutor(args.workers) as pool:
+        for kind in ("uniform", "clustered"):
+            for n in args.sizes:
+                coords = instance(n, kind, rng)
+                matrix = haversine_matrix(coords, DETOUR_FACTOR)
+
+                start = time.perf_counter()
+                full = solve_route(coords, matrix, PENALTY, time_limit_ms=args.time_limit_ms)
+                full_s = time.perf_counter() - start
+
+                start = time.perf_counter()
+                order = asyncio.run(decomposed(coords, pool, args.workers, args.cluster_max_stops, args.time_limit_ms))
+                decomposed_s = time.perf_counter() - start
+                assert sorted(order) == list(range(n)) and order[0] == 0
+
+                gap = route_cost(coords, matrix, order, PENALTY) / route_cost(coords, matrix, full, PENALTY) - 1
+                print(
+                    f"{kind:<9} n={n:<5} gap={gap * 100:+.1f}% "
+                    f"full={full_s:.1f}s decomposed={decomposed_s:.1f}s",
+                    flush=True
+                )
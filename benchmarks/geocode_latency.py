@@ -0,0 +1,55 @@
+"""Geocoding latency of one request's addresses, sequential vs concurrent
+
+Every run geocodes fresh addresses against the mock upstream, so each lookup is a
+cache miss that waits on the simulated network latency.
+
+    python benchmarks/geocode_latency.py [--addresses 40] [--runs 30] [--latency-ms 30 70]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from _setup import isolate_caches
+
+isolate_caches()
+
+import main  # noqa: E402
+from mock_upstream import MockUpstream  # noqa: E402
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure(concurrency, addresses, runs, tag):
+    latencies = []
+    for run in range(runs):
+        batch = [f"{tag} run {run} stop {i}" for i in range(addresses)]
+        start = time.perf_counter()
+        results = await main.geocode_addresses(batch, "benchmark", concurrency)
+        latencies.append(time.perf_counter() - start)
+        assert all(lat is not None for lat, _, _ in results)
+    return latencies
+
+
+async def run(args):
+    for concurrency in sorted({1, main.GEOCODE_CONCURRENCY}):
+        latencies = await measure(concurrency, args.addresses, args.runs, f"c{concurrency}")
+        print(
+            f"concurrency={concurrency:<3} addresses={args.addresses} "
+            f"p50={statistics.median(latencies) * 1000:.0f}ms p99={percentile(latencies, 0.99) * 1000:.0f}ms"
+        )
+    await main.aclose_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--addresses", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(30, 70))
+    args = parser.parse_args()
+
+    MockUpstream(latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000)).install()
+    asyncio.run(run(args))
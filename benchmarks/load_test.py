@@ -0,0 +1,60 @@
+"""Throughput of POST /optimize-route under increasing client concurrency
+
+Starts the app in a single uvicorn worker on a local port, with upstream calls
+going to the mock, and fires requests with fresh addresses so no cache absorbs
+them. Throughput should grow with concurrency while requests wait on the
+upstream, instead of staying flat as it does when one request blocks the loop.
+
+    python benchmarks/load_test.py [--stops 10] [--concurrency 1 4 16 64] [--latency-ms 40 60]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from _setup import isolate_caches
+
+isolate_caches()
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import main  # noqa: E402
+from mock_upstream import MockUpstream  # noqa: E402
+
+
+async def measure(url, concurrency, requests, stops):
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(timeout=300) as client:
+        async def one(i):
+            async with semaphore:
+                addresses = [f"load c{concurrency} request {i} stop {j}" for j in range(stops)]
+                resp = await client.post(url, json={"addresses": addresses})
+                assert resp.status_code == 200, resp.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stops", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=(1, 4, 16, 64))
+    parser.add_argument("--latency-ms", type=float, nargs=2, default=(40, 60))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    MockUpstream(latency=(args.latency_ms[0] / 1000, args.latency_ms[1] / 1000)).install()
+    server = uvicorn.Server(uvicorn.Config(main.app, port=args.port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}/optimize-route"
+    try:
+        for concurrency in args.concurrency:
+            throughput = asyncio.run(measure(url, concurrency, max(8, concurrency * 3), args.stops))
+            print(f"concurrency={concurrency:<3} throughput={throughput:.1f} req/s", flush=True)
+    finally:
+        server.should_exit = True
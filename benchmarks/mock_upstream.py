@@ -0,0 +1,90 @@
+"""Offline stand-in for the Google Maps APIs, for benchmarks
+
+install() swaps the pooled clients in http_client for httpx.MockTransport ones that
+answer geocode, distance matrix and directions requests with synthetic data after
+a random latency.
+"""
+import asyncio
+import random
+import time
+from typing import Tuple
+
+import httpx
+
+import http_client
+
+
+class MockUpstream:
+    def __init__(self, latency: Tuple[float, float] = (0.0, 0.0), seed: int = 0):
+        self.rng = random.Random(seed)
+        self.latency = latency
+        self.calls = {"geocode": 0, "distancematrix": 0, "directions": 0}
+        self.elements = 0
+        self.points = {}
+
+    def point(self, address: str) -> Tuple[float, float]:
+        if address not in self.points:
+            self.points[address] = (self.rng.uniform(12.9, 13.1), self.rng.uniform(77.5, 77.7))
+        return self.points[address]
+
+    @staticmethod
+    def distance(origin: str, destination: str) -> int:
+        a = tuple(map(float, origin.split(",")))
+        b = tuple(map(float, destination.split(",")))
+        return int(111000 * ((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 * 1.3)
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        path = request.url.path
+        if "geocode" in path:
+            self.calls["geocode"] += 1
+            lat, lng = self.point(params["address"])
+            return httpx.Response(200, json={"status": "OK", "results": [{
+                "geometry": {"location": {"lat": lat, "lng": lng}},
+                "formatted_address": params["address"].title()
+            }]})
+        if "distancematrix" in path:
+            self.calls["distancematrix"] += 1
+            origins = params["origins"].split("|")
+            destinations = params["destinations"].split("|")
+            self.elements += len(origins) * len(destinations)
+            return httpx.Response(200, json={"status": "OK", "rows": [
+                {"elements": [{"status": "OK", "distance": {"value": self.distance(a, b)}} for b in destinations]}
+                for a in origins
+            ]})
+        if "directions" in path:
+            self.calls["directions"] += 1
+            return httpx.Response(200, json={"status": "OK", "routes": [{"legs": [{"steps": [{
+                "html_instructions": f"Head <b>north</b> to {params['destination']}",
+                "distance": {"text": "1 km"},
+                "duration": {"text": "2 mins"}
+            }]}]}]})
+        return httpx.Response(404)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency[1]:
+            time.sleep(self.rng.uniform(*self.latency))
+        return self.respond(request)
+
+    async def ahandle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency[1]:
+            await asyncio.sleep(self.rng.uniform(*self.latency))
+        return self.respond(request)
+
+    def install(self) -> "MockUpstream":
+        http_client.close_clients()
+        client, async_client = httpx.Client, httpx.AsyncClient
+
+        class MockHttpx:
+            pass
+
+        mock = MockHttpx()
+        mock.__dict__.update(httpx.__dict__)
+        mock.Client = lambda **kwargs: client(
+            transport=httpx.MockTransport(self.handle), **{k: v for k, v in kwargs.items() if k != "http2"}
+        )
+        mock.AsyncClient = lambda **kwargs: async_client(
+            transport=httpx.MockTransport(self.ahandle), **{k: v for k, v in kwargs.items() if k != "http2"}
+        )
+        http_client.httpx = mock
+        return self
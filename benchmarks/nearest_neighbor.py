@@ -0,0 +1,37 @@
+"""Nearest-neighbour construction: vectorized solver vs the original per-candidate loop
+
+The original loop is the oracle kept in tests/test_nearest_neighbor.py, which also
+guards that both produce the same order; here they are only timed.
+
+    python benchmarks/nearest_neighbor.py [--sizes 100 1000 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+from _setup import ROOT
+
+sys.path.insert(1, os.path.join(ROOT, "tests"))
+
+from solver import solve_tsp_nearest_neighbor_with_right_turn_penalty  # noqa: E402
+from test_nearest_neighbor import instance, reference_nearest_neighbor  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=(100, 1000, 5000))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    for n in args.sizes:
+        coords, matrix = instance(n, "asymmetric", rng)
+        start = time.perf_counter()
+        reference_nearest_neighbor(coords, matrix)
+        before = time.perf_counter() - start
+        start = time.perf_counter()
+        solve_tsp_nearest_neighbor_with_right_turn_penalty(coords, matrix)
+        after = time.perf_counter() - start
+        print(f"n={n:<5} before={before * 1000:.1f}ms after={after * 1000:.1f}ms speedup={before / after:.0f}x", flush=True)
@@ -0,0 +1,123 @@
+"""Local road graph: preprocessing time and 100 x 100 distance matrix query time
+
+By default a synthetic city is generated: a grid of two-way avenues and
+alternating one-way streets, each way drawn with shape nodes. Matrix rows are
+checked against plain Dijkstra on the uncollapsed network. --graph times
+queries on a graph already built from an OSM extract by road_graph.py instead.
+
+    python benchmarks/road_graph.py [--size 30] [--stops 100] [--check-rows 5]
+    python benchmarks/road_graph.py --graph <dir> [--stops 100]
+"""
+import argparse
+import heapq
+import math
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import _setup  # noqa: F401
+from road_graph import RoadGraph, build_road_graph
+
+SPACING_DEG = 0.003
+SHAPE_NODES = 3
+
+
+def synthetic_city(size, rng):
+    lat, lng, tails, heads, speeds = [], [], [], [], []
+
+    def add_node(y, x):
+        lat.append(12.9 + y * SPACING_DEG)
+        lng.append(77.5 + x * SPACING_DEG)
+        return len(lat) - 1
+
+    grid = [[add_node(r, c) for c in range(size)] for r in range(size)]
+
+    def add_way(a, b, direction, speed):
+        (ya, xa), (yb, xb) = a, b
+        chain = [grid[ya][xa]]
+        for k in range(1, SHAPE_NODES + 1):
+            t = k / (SHAPE_NODES + 1)
+            chain.append(add_node(ya + (yb - ya) * t + rng.uniform(-0.1, 0.1), xa + (xb - xa) * t + rng.uniform(-0.1, 0.1)))
+        chain.append(grid[yb][xb])
+        for u, v in zip(chain, chain[1:]):
+            if direction >= 0:
+                tails.append(u), heads.append(v), speeds.append(speed)
+            if direction <= 0:
+                tails.append(v), heads.append(u), speeds.append(speed)
+
+    for r in range(size):
+        for c in range(size):
+            avenue = r % 5 == 0 or r == size - 1
+            if c + 1 < size:
+                add_way((r, c), (r, c + 1), 0 if avenue else (1 if r % 2 else -1), 60 if avenue else rng.uniform(20, 40))
+            if r + 1 < size:
+                add_way((r, c), (r + 1, c), 0, 60 if c % 5 == 0 else rng.uniform(20, 40))
+
+    lat, lng = np.array(lat), np.array(lng)
+    tails, heads = np.array(tails, dtype=np.int64), np.array(heads, dtype=np.int64)
+    dist = 111320 * np.hypot(lat[tails] - lat[heads], (lng[tails] - lng[heads]) * math.cos(math.radians(12.9)))
+    return lat, lng, tails, heads, dist, dist / (np.array(speeds) / 3.6)
+
+
+def dijkstra_times(n, tails, heads, time, source):
+    adjacency = [[] for _ in range(n)]
+    for u, v, t in zip(tails.tolist(), heads.tolist(), time.tolist()):
+        adjacency[u].append((v, t))
+    best = [math.inf] * n
+    best[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        t, u = heapq.heappop(heap)
+        if t > best[u]:
+            continue
+        for v, leg in adjacency[u]:
+            if t + leg < best[v]:
+                best[v] = t + leg
+                heapq.heappush(heap, (best[v], v))
+    return np.array(best)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--graph", help="Graph directory built by road_graph.py; skips the synthetic city")
+    parser.add_argument("--size", type=int, default=30, help="Synthetic city intersections per side")
+    parser.add_argument("--stops", type=int, default=100)
+    parser.add_argument("--check-rows", type=int, default=5, help="Matrix rows checked against Dijkstra")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    network = None
+    path = args.graph
+    if path is None:
+        network = synthetic_city(args.size, rng)
+        path = tempfile.mkdtemp(prefix="smart-route-graph-")
+        start = time.perf_counter()
+        build_road_graph(*network, path)
+        print(f"built {len(network[0])} nodes / {len(network[2])} edges in {time.perf_counter() - start:.1f}s")
+
+    graph = RoadGraph(path)
+    nodes = rng.sample(range(graph.node_count), min(args.stops, graph.node_count))
+    coords = [(float(graph.lat[i]), float(graph.lng[i])) for i in nodes]
+
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        distances, durations = graph.distance_matrix(coords)
+        timings.append(time.perf_counter() - start)
+    print(
+        f"{graph.node_count} graph nodes, {len(coords)} x {len(coords)} matrix: "
+        f"best {min(timings) * 1000:.0f}ms, median {sorted(timings)[len(timings) // 2] * 1000:.0f}ms"
+    )
+
+    if network is not None and args.check_rows:
+        lat, lng, tails, heads, dist, travel_time = network
+        original = {(a, b): i for i, (a, b) in enumerate(zip(lat.tolist(), lng.tolist()))}
+        ids = np.array([original[c] for c in coords])
+        for row in range(min(args.check_rows, len(coords))):
+            expected = dijkstra_times(len(lat), tails, heads, travel_time, ids[row])[ids]
+            np.testing.assert_allclose(durations[row], expected, rtol=1e-6)
+        print(f"{min(args.check_rows, len(coords))} rows match plain Dijkstra")
@@ -0,0 +1,263 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class SqliteLRUCache:
+    """Persistent key/value cache with LRU eviction by entry count and bytes"""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 50000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds or None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._entries = 0
+        self._bytes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use so importing is side-effect free"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            self._conn = conn
+            self._refresh_totals()
+        return self._conn
+
+    def _refresh_totals(self) -> None:
+        """Re-read the entry count and total size from the database
+
+        Other processes (uvicorn workers, the Streamlit client) may share the file, so
+        in-process totals are only trusted within a single write transaction.
+        """
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Return the cached values for every key that is present and fresh"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found: Dict[str, Any] = {}
+        expired: List[str] = []
+        now = time.time()
+
+        with self._lock:
+            conn = self._connect()
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key, value, created_at FROM entries WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+
+            hit_keys = list(found)
+            for start in range(0, len(hit_keys), 500):
+                chunk = hit_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                conn.execute(
+                    f"UPDATE entries SET accessed_at = ? WHERE key IN ({placeholders})",
+                    [now, *chunk]
+                )
+            if expired:
+                self._delete(conn, expired)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+
+        return found
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serialisable value under key"""
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """Store several JSON-serialisable values in one transaction"""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            # Take the write lock up front so the totals read below stay accurate
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._refresh_totals()
+                for key, value in items.items():
+                    payload = json.dumps(value)
+                    size = len(key.encode()) + len(payload.encode())
+                    row = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is None:
+                        self._entries += 1
+                    else:
+                        self._bytes -= row[0]
+                    self._bytes += size
+                    conn.execute(
+                        "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (key, payload, size, now, now)
+                    )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._refresh_totals()
+                raise
+
+    def _delete(self, conn: sqlite3.Connection, keys: List[str]) -> None:
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            count, size = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE key IN ({placeholders})",
+                chunk
+            ).fetchone()
+            conn.execute(f"DELETE FROM entries WHERE key IN ({placeholders})", chunk)
+            self._entries -= count
+            self._bytes -= size
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones until within bounds"""
+        if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+
+        if self.ttl_seconds is not None:
+            expired = [
+                key for (key,) in conn.execute(
+                    "SELECT key FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+                )
+            ]
+            if expired:
+                self._delete(conn, expired)
+                self.evictions += len(expired)
+
+        while self._entries > self.max_entries or self._bytes > self.max_bytes:
+            batch = max(self._entries - self.max_entries, 1)
+            oldest = [
+                key for (key,) in conn.execute(
+                    "SELECT key FROM entries ORDER BY accessed_at LIMIT ?", (batch,)
+                )
+            ]
+            if not oldest:
+                break
+            self._delete(conn, oldest)
+            self.evictions += len(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            self._connect()
+            self._refresh_totals()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._entries,
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            self._entries = self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def normalize_address(address: str) -> str:
+    """Canonical cache key for an address: case and whitespace insensitive"""
+    return " ".join(address.lower().split())
+
+
+def leg_cache_key(origin: Tuple[float, float], destination: Tuple[float, float], mode: str) -> str:
+    """Cache key for a single origin -> destination leg"""
+    return f"{mode}|{origin[0]:.6f},{origin[1]:.6f}|{destination[0]:.6f},{destination[1]:.6f}"
+
+
+_caches: Dict[str, SqliteLRUCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_from_env(prefix: str, default_entries: int, default_ttl: float) -> SqliteLRUCache:
+    """Shared cache configured from <prefix>_PATH, _MAX_ENTRIES, _MAX_BYTES and _TTL_SECONDS on first use"""
+    with _caches_lock:
+        if prefix not in _caches:
+            _caches[prefix] = SqliteLRUCache(
+                os.getenv(f"{prefix}_PATH", f"{prefix.lower()}.sqlite3"),
+                max_entries=int(os.getenv(f"{prefix}_MAX_ENTRIES", str(default_entries))),
+                max_bytes=int(os.getenv(f"{prefix}_MAX_BYTES", str(64 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv(f"{prefix}_TTL_SECONDS", str(default_ttl)))
+            )
+        return _caches[prefix]
+
+
+def get_geocode_cache() -> SqliteLRUCache:
+    """Shared geocode cache"""
+    # Geocode results rarely change, so a long TTL is safe
+    return _cache_from_env("GEOCODE_CACHE", 100000, 30 * 24 * 3600)
+
+
+def get_leg_cache() -> SqliteLRUCache:
+    """Shared cache of origin -> destination distances"""
+    # Road distances only shift with network changes; a week keeps them fresh enough
+    return _cache_from_env("LEG_CACHE", 1000000, 7 * 24 * 3600)
+
+
+def get_route_store() -> SqliteLRUCache:
+    """Shared store of optimized routes, keyed by route id"""
+    # Short TTL: a stored route only needs to outlive the dispatcher's follow-up calls
+    return _cache_from_env("ROUTE_STORE", 10000, 3600)
+
+
+def get_response_cache() -> SqliteLRUCache:
+    """Shared cache of /optimize-route results, keyed by canonical request hash"""
+    # Same horizon as the route store: long enough for refreshes and retries of a manifest
+    return _cache_from_env("RESPONSE_CACHE", 10000, 3600)
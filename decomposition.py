@@ -0,0 +1,199 @@
+import asyncio
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from providers import haversine_matrix
+from solver import (
+    improve_route,
+    resequence_window,
+    solve_route,
+    solve_tsp_nearest_neighbor_with_right_turn_penalty,
+    window_ranges
+)
+
+# Stops on each side of a cluster boundary that are re-sequenced when stitching
+JUNCTION_WINDOW = 4
+
+# k-means asks for this many times the minimum cluster count, leaving room for
+# uneven natural groups; Lloyd iterations are capped
+KMEANS_CLUSTER_FACTOR = 1.2
+KMEANS_ITERATIONS = 30
+
+# Time budget for ordering the cluster centroids
+CLUSTER_ORDER_TIME_LIMIT_MS = 100
+
+# Async source of the distance matrix for a subset of stops, in metres
+MatrixSource = Callable[[List[Tuple[float, float]]], Awaitable[Optional[np.ndarray]]]
+
+# Runs a solver function off the event loop: run_solver(func, *args, **kwargs)
+SolverRunner = Callable[..., Awaitable]
+
+def _project(coords: List[Tuple[float, float]]) -> np.ndarray:
+    """Coordinates with longitude scaled by the cosine of latitude, so axes are comparable"""
+    points = np.asarray(coords, dtype=float).reshape(-1, 2)
+    lng_scale = math.cos(math.radians(float(points[:, 0].mean()))) if len(points) else 1.0
+    return points * np.array([1.0, lng_scale])
+
+def _bisect(points: np.ndarray, members: np.ndarray, max_cluster_size: int) -> List[List[int]]:
+    """Halve members at the median of their wider axis until every part fits"""
+    clusters = []
+    pending = [members]
+    while pending:
+        members = pending.pop()
+        if len(members) <= max_cluster_size:
+            clusters.append(members.tolist())
+            continue
+        axis = int(np.argmax(np.ptp(points[members], axis=0)))
+        members = members[np.argsort(points[members, axis], kind="stable")]
+        half = len(members) // 2
+        pending.extend([members[half:], members[:half]])
+    return clusters
+
+def partition_stops(coords: List[Tuple[float, float]], max_cluster_size: int) -> List[List[int]]:
+    """Spatial clusters of at most max_cluster_size stops
+
+    k-means finds the natural groups of drops. Any cluster still over the size cap is
+    halved at the median of its wider axis until it fits. Seeded, so the same stops
+    always give the same clusters.
+    """
+    points = _project(coords)
+    n = len(points)
+    k = math.ceil(n / max_cluster_size * KMEANS_CLUSTER_FACTOR)
+    if k <= 1:
+        return _bisect(points, np.arange(n), max_cluster_size)
+
+    rng = np.random.default_rng(0)
+    centres = points[rng.choice(n, k, replace=False)]
+    labels = np.zeros(n, dtype=int)
+    for _ in range(KMEANS_ITERATIONS):
+        labels = ((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centres)
+        np.add.at(sums, labels, points)
+        moved = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centres)
+        if np.allclose(moved, centres):
+            break
+        centres = moved
+
+    clusters = []
+    for label in range(k):
+        members = np.flatnonzero(labels == label)
+        if len(members):
+            clusters.extend(_bisect(points, members, max_cluster_size))
+    return clusters
+
+def order_clusters(coords: List[Tuple[float, float]], clusters: List[List[int]]) -> List[List[int]]:
+    """Visit order for the clusters: a route over their centroids starting from the
+    cluster that holds stop 0
+    """
+    first = next(k for k, members in enumerate(clusters) if 0 in members)
+    clusters = [clusters[first]] + clusters[:first] + clusters[first + 1:]
+    if len(clusters) <= 2:
+        return clusters
+
+    points = np.asarray(coords, dtype=float).reshape(-1, 2)
+    centroids = [tuple(points[members].mean(axis=0)) for members in clusters]
+    matrix = haversine_matrix(centroids)
+    order = solve_tsp_nearest_neighbor_with_right_turn_penalty(centroids, matrix, right_turn_penalty=0)
+    order = improve_route(centroids, matrix, order, right_turn_penalty=0, time_limit_ms=CLUSTER_ORDER_TIME_LIMIT_MS)
+    return [clusters[k] for k in order]
+
+def cluster_entries(coords: List[Tuple[float, float]], clusters: List[List[int]]) -> List[int]:
+    """Stop at which each cluster is entered: stop 0 for the first, otherwise the
+    member closest to any stop of the preceding cluster
+    """
+    entries = [0]
+    for previous, members in zip(clusters, clusters[1:]):
+        distances = haversine_matrix([coords[i] for i in previous + members])[:len(previous), len(previous):]
+        entries.append(members[int(distances.min(axis=0).argmin())])
+    return entries
+
+def plan_clusters(coords: List[Tuple[float, float]], max_cluster_size: int) -> List[List[int]]:
+    """Clusters in visit order, each with its entry stop first so the solver starts from it"""
+    clusters = order_clusters(coords, partition_stops(coords, max_cluster_size))
+    entries = cluster_entries(coords, clusters)
+    return [[entry] + [i for i in members if i != entry] for members, entry in zip(clusters, entries)]
+
+async def solve_decomposed(
+    coords: List[Tuple[float, float]],
+    max_cluster_size: int,
+    get_matrix: MatrixSource,
+    run_solver: SolverRunner,
+    workers: int = 1,
+    **solve_kwargs
+) -> Tuple[List[int], float]:
+    """Route thousands of stops cluster by cluster, returning the order and its
+    total distance in metres
+
+    Stops are split into compact clusters, visited in centroid order. Each cluster
+    is solved in parallel from its entry stop, using only its own distance matrix.
+    The sub-routes are concatenated. Then the stops on either side of every
+    boundary are re-sequenced exactly, right-turn penalty included, against a small
+    matrix of the junction. No n x n matrix is ever built.
+
+    Clusters queue on the solver's workers, so the time budgets in solve_kwargs are
+    split across the rounds of clusters that run workers at a time; the whole solve
+    then takes about one budget.
+    """
+    # k-means and the centroid route take seconds at tens of thousands of stops
+    clusters = await run_solver(plan_clusters, coords, max_cluster_size)
+
+    matrices = await asyncio.gather(*(get_matrix([coords[i] for i in members]) for members in clusters))
+    if any(matrix is None for matrix in matrices):
+        raise ValueError("Could not retrieve a cluster distance matrix")
+
+    rounds = math.ceil(len(clusters) / max(workers, 1))
+    cluster_kwargs = dict(solve_kwargs)
+    for budget in ("time_limit_ms", "local_search_time_limit_ms"):
+        if cluster_kwargs.get(budget):
+            cluster_kwargs[budget] = cluster_kwargs[budget] / rounds
+
+    legs: Dict[Tuple[int, int], float] = {}
+    sub_orders = await asyncio.gather(*(
+        run_solver(solve_route, [coords[i] for i in members], matrix, **cluster_kwargs)
+        for members, matrix in zip(clusters, matrices)
+    ))
+
+    route = []
+    boundaries = []
+    for members, matrix, sub_order in zip(clusters, matrices, sub_orders):
+        if route:
+            boundaries.append(len(route))
+        route.extend(members[k] for k in sub_order)
+        for a, b in zip(sub_order, sub_order[1:]):
+            legs[members[a], members[b]] = float(matrix[a][b])
+
+    # Stitch: re-sequence each boundary between the fixed stops around it
+    penalty = solve_kwargs.get("right_turn_penalty", 500)
+    windows = window_ranges(len(route), boundaries, JUNCTION_WINDOW)
+    window_stops = [route[lo - 1:hi + 1] for lo, hi in windows]
+    window_matrices = await asyncio.gather(*(get_matrix([coords[i] for i in stops]) for stops in window_stops))
+    fetched = [
+        (window, stops, matrix)
+        for window, stops, matrix in zip(windows, window_stops, window_matrices)
+        if matrix is not None
+    ]
+    stitched = await asyncio.gather(*(
+        run_solver(resequence_window, [coords[i] for i in stops], matrix, penalty, hi < len(route))
+        for (lo, hi), stops, matrix in fetched
+    ))
+
+    for ((lo, hi), stops, matrix), sub_order in zip(fetched, stitched):
+        for a in range(len(stops)):
+            for b in range(len(stops)):
+                legs[stops[a], stops[b]] = float(matrix[a][b])
+        if sub_order is not None:
+            route[lo - 1:hi + 1] = [stops[k] for k in sub_order]
+
+    # Any leg not covered by a fetched matrix (a window that could not be fetched)
+    missing = [(a, b) for a, b in zip(route, route[1:]) if (a, b) not in legs]
+    pairs = await asyncio.gather(*(get_matrix([coords[a], coords[b]]) for a, b in missing))
+    for (a, b), matrix in zip(missing, pairs):
+        if matrix is None:
+            raise ValueError("Could not retrieve a junction distance")
+        legs[a, b] = float(matrix[0][1])
+
+    total_distance = sum(legs[a, b] for a, b in zip(route, route[1:]))
+    return route, total_distance
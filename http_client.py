@@ -0,0 +1,88 @@
+import os
+import threading
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+_clients: Dict[str, httpx.Client] = {}
+_clients_lock = threading.Lock()
+
+
+def _timeout() -> httpx.Timeout:
+    """Connect/read timeouts from HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT (seconds)"""
+    connect = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    read = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+    return httpx.Timeout(read, connect=connect)
+
+
+def _limits() -> httpx.Limits:
+    """Connection pool bounds, applied per upstream host"""
+    return httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    )
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_client(url: str) -> httpx.Client:
+    """Shared keep-alive client for the host of url, one connection pool per host"""
+    origin = _origin(url)
+    with _clients_lock:
+        client = _clients.get(origin)
+        if client is None:
+            client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                timeout=_timeout(),
+                limits=_limits()
+            )
+            _clients[origin] = client
+        return client
+
+
+def close_clients() -> None:
+    """Close every pooled connection; clients are recreated on next use"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """Shared keep-alive async client for the host of url, one connection pool per host"""
+    origin = _origin(url)
+    with _clients_lock:
+        client = _async_clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=_timeout(),
+                limits=_limits()
+            )
+            _async_clients[origin] = client
+        return client
+
+
+async def aclose_clients() -> None:
+    """Close every pooled async connection; clients are recreated on next use"""
+    with _clients_lock:
+        clients = list(_async_clients.values())
+        _async_clients.clear()
+    for client in clients:
+        await client.aclose()
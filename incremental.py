@@ -0,0 +1,107 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from solver import insert_stops, resequence_window, window_ranges
+
+# Stops either side of each insertion or removal that the repair pass re-sequences
+REPAIR_WINDOW = 3
+
+# Async source of the entries marked in an n x n boolean mask of the distance matrix
+# for coords, in metres; unmarked entries may be NaN
+PartialMatrixSource = Callable[[List[Tuple[float, float]], np.ndarray], Awaitable[Optional[np.ndarray]]]
+
+# Runs a solver function off the event loop: run_solver(func, *args, **kwargs)
+SolverRunner = Callable[..., Awaitable]
+
+async def update_route(
+    coords: List[Tuple[float, float]],
+    order: List[int],
+    removed: List[int],
+    added: List[Tuple[float, float]],
+    get_matrix: PartialMatrixSource,
+    run_solver: SolverRunner,
+    right_turn_penalty: float = 500
+) -> Tuple[List[Tuple[float, float]], List[int], List[int], float]:
+    """Remove and insert stops in an optimized route without re-solving it
+
+    Removed stops are dropped and their neighbours joined up. New stops go in by
+    turn-aware cheapest insertion. Then the few stops around every change are
+    re-sequenced exactly. Only the route's legs, the rows and columns of the new
+    stops, and the pairs inside the repair windows are requested from get_matrix.
+
+    Returns (coords, order, kept, total_distance). coords holds the kept stops in
+    their original index order, followed by the added stops. order is the new route
+    over those indices. kept gives the old index of each kept stop. total_distance
+    is in metres.
+    """
+    removed_set = set(removed)
+    kept = [i for i in range(len(coords)) if i not in removed_set]
+    index = {old: new for new, old in enumerate(kept)}
+    new_coords = [coords[i] for i in kept] + list(added)
+    n = len(new_coords)
+    new_stops = list(range(len(kept), n))
+
+    base = [index[i] for i in order if i in index]
+    if not base:
+        base, new_stops = new_stops[:1], new_stops[1:]
+
+    # Kept stops that lost a neighbour to a removal
+    touched = set()
+    for a, b in zip(order, order[1:]):
+        if a in removed_set and b in index:
+            touched.add(index[b])
+        elif b in removed_set and a in index:
+            touched.add(index[a])
+
+    # The route's legs, plus every leg to and from a new stop
+    needed = np.zeros((n, n), dtype=bool)
+    needed[base[:-1], base[1:]] = True
+    needed[new_stops, :] = True
+    needed[:, new_stops] = True
+    np.fill_diagonal(needed, False)
+    matrix = await get_matrix(new_coords, needed)
+    if matrix is None:
+        raise ValueError("Could not retrieve the distances of the new stops")
+
+    route = base
+    if new_stops:
+        route = await run_solver(insert_stops, new_coords, matrix, base, new_stops, right_turn_penalty)
+
+    # Repair: re-sequence the neighbourhood of every change between fixed stops
+    position = {stop: p for p, stop in enumerate(route)}
+    changed = sorted(position[stop] for stop in touched | set(new_stops))
+    windows = window_ranges(len(route), changed, REPAIR_WINDOW)
+    window_stops = [route[lo - 1:hi + 1] for lo, hi in windows]
+
+    needed = np.zeros((n, n), dtype=bool)
+    for stops in window_stops:
+        needed[np.ix_(stops, stops)] = True
+    np.fill_diagonal(needed, False)
+    needed &= np.isnan(matrix)
+    if needed.any():
+        extra = await get_matrix(new_coords, needed)
+        if extra is None:
+            # Keep the inserted route rather than fail the update
+            print("Repair distances unavailable, skipping the repair pass")
+            windows, window_stops = [], []
+        else:
+            matrix = np.where(needed, extra, matrix)
+
+    repaired = await asyncio.gather(*(
+        run_solver(
+            resequence_window,
+            [new_coords[i] for i in stops],
+            matrix[np.ix_(stops, stops)],
+            right_turn_penalty,
+            hi < len(route)
+        )
+        for (lo, hi), stops in zip(windows, window_stops)
+    ))
+    for (lo, hi), stops, sub_order in zip(windows, window_stops, repaired):
+        if sub_order is not None:
+            route[lo - 1:hi + 1] = [stops[k] for k in sub_order]
+
+    total_distance = float(sum(matrix[a][b] for a, b in zip(route, route[1:])))
+    return new_coords, route, kept, total_distance
@@ -0,0 +1,182 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Pipeline stages a route job reports progress through, in order
+JOB_STAGES = ("geocoding", "matrix", "solving")
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class JobError(Exception):
+    """Expected job failure, reported to the client with its status code"""
+
+    def __init__(self, detail: str, status_code: int = 500):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class JobQueueFull(Exception):
+    """Raised by submit when too many jobs are waiting or running"""
+
+
+class Job:
+    """One queued optimization, its progress and its outcome"""
+
+    def __init__(self, payload: Any):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.progress: Dict[str, float] = {stage: 0.0 for stage in JOB_STAGES}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.status_code: Optional[int] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._done = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def report(self, stage: str, progress: float = 0.0) -> None:
+        """Record progress (0 to 1) within a stage; earlier stages count as complete"""
+        for earlier in JOB_STAGES[:JOB_STAGES.index(stage)]:
+            self.progress[earlier] = 1.0
+        self.stage = stage
+        self.progress[stage] = max(self.progress[stage], min(progress, 1.0))
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.time()
+        if status == "succeeded":
+            for stage in JOB_STAGES:
+                self.progress[stage] = 1.0
+        self._done.set()
+
+
+class JobQueue:
+    """In-process queue of jobs drained by a fixed number of asyncio workers
+
+    handler(job) does the work and returns the result. It can report progress
+    through job.report. Cancelling a running job cancels the handler's task. Solver
+    work already handed to the process pool still runs to the end of its own time
+    budget, but its result is discarded. Finished jobs are kept for
+    retention_seconds so clients can collect them.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Job], Awaitable[Any]],
+        workers: int = 2,
+        max_jobs: int = 1000,
+        retention_seconds: float = 3600
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self.retention_seconds = retention_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Stop the workers, cancelling any job still queued or running"""
+        self._stopping = True
+        for job in self._jobs.values():
+            if not job.finished:
+                self.cancel(job.id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def submit(self, payload: Any) -> Job:
+        """Queue a job and return it at once"""
+        if self._queue is None:
+            raise RuntimeError("Job queue is not running")
+        self._prune()
+        if sum(not job.finished for job in self._jobs.values()) >= self.max_jobs:
+            raise JobQueueFull("Too many jobs queued")
+        job = Job(payload)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; finished jobs are left as they are"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job._task is not None:
+            job._task.cancel()
+        job._finish("cancelled")
+        return job
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Return once the job finishes or timeout seconds pass, whichever is first"""
+        if timeout > 0 and not job.finished:
+            try:
+                await asyncio.wait_for(job._done.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status: 0 for status in ("queued", "running") + FINISHED_STATUSES}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {**counts, "workers": self.workers, "max_jobs": self.max_jobs}
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.finished:
+                # Cancelled while queued
+                continue
+
+            job.status = "running"
+            job.started_at = time.time()
+            job._task = asyncio.create_task(self.handler(job))
+            try:
+                result = await job._task
+                if not job.finished:
+                    job.result = result
+                    job._finish("succeeded")
+            except asyncio.CancelledError:
+                if not job.finished:
+                    job._finish("cancelled")
+                if self._stopping:
+                    raise
+            except JobError as e:
+                job.error, job.status_code = e.detail, e.status_code
+                job._finish("failed")
+            except Exception as e:
+                print(f"Job {job.id} error: {e!r}")
+                job.error, job.status_code = "Job failed", 500
+                job._finish("failed")
+            finally:
+                job._task = None
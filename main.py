@@ -1,18 +1,138 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Tuple, Optional
-import requests
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, Callable, Dict, List, Literal, Tuple, Optional
+import httpx
 import numpy as np
 import math
 import re
 import os
+import asyncio
+import multiprocessing
+import hashlib
+import functools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 
-# Load environment variables
+# Load environment variables before the local modules read their settings
 load_dotenv()
 
-app = FastAPI(title="Smart Route API", description="Route optimization API for deliveries")
+from http_client import get_async_client, aclose_clients, close_clients
+from cache import get_geocode_cache, get_leg_cache, get_response_cache, get_route_store, normalize_address
+from providers import HAVERSINE_DETOUR_FACTOR, available_providers, get_provider, haversine_legs
+from solver import (
+    CANDIDATE_LISTS_MIN_STOPS,
+    SharedMatrix,
+    candidate_lists,
+    count_right_turns,
+    iterated_local_search,
+    route_cost,
+    solve_hilbert,
+    solve_route,
+    solve_route_shared
+)
+from decomposition import solve_decomposed
+from incremental import update_route
+from jobs import Job, JobError, JobQueue, JobQueueFull
+
+# Maximum number of geocoding requests in flight for a single route
+GEOCODE_CONCURRENCY = int(os.getenv("GEOCODE_CONCURRENCY", "8"))
+
+# Maximum number of directions legs in flight for a single route
+DIRECTIONS_CONCURRENCY = int(os.getenv("DIRECTIONS_CONCURRENCY", "8"))
+
+# Distance provider used when a request does not choose one, and the one
+# tried when it fails (empty disables the fallback)
+DISTANCE_PROVIDER = os.getenv("DISTANCE_PROVIDER", "google")
+DISTANCE_FALLBACK_PROVIDER = os.getenv("DISTANCE_FALLBACK_PROVIDER", "haversine")
+
+# Worker processes for CPU-bound solver work; 0 runs solvers on the threadpool instead
+SOLVER_WORKERS = int(os.getenv("SOLVER_WORKERS", str(os.cpu_count() or 1)))
+
+# Time budget for 2-opt/Or-opt improvement after nearest neighbour; 0 disables it
+LOCAL_SEARCH_TIME_LIMIT_MS = float(os.getenv("LOCAL_SEARCH_TIME_LIMIT_MS", "200"))
+
+# Local search on larger routes only tries moves towards each stop's k cheapest
+# neighbours (0 always searches the full neighbourhood)
+LOCAL_SEARCH_NEIGHBOURS = int(os.getenv("LOCAL_SEARCH_NEIGHBOURS", "10"))
+
+# Routes with at most this many stops are solved exactly (0 disables); the exact solver
+# gives up and falls back to the heuristic past its time or memory bound
+EXACT_SOLVER_MAX_STOPS = int(os.getenv("EXACT_SOLVER_MAX_STOPS", "15"))
+EXACT_SOLVER_TIME_LIMIT_MS = float(os.getenv("EXACT_SOLVER_TIME_LIMIT_MS", "2000"))
+EXACT_SOLVER_MAX_MEMORY_MB = int(os.getenv("EXACT_SOLVER_MAX_MEMORY_MB", "256"))
+
+# Upper bound on a request's time_limit_ms, the budget for anytime optimization
+MAX_ROUTE_TIME_LIMIT_MS = int(os.getenv("MAX_ROUTE_TIME_LIMIT_MS", "60000"))
+
+# Differently seeded solver starts run in parallel per route (1 disables multi-start),
+# and the most a request may ask for. Starts beyond SOLVER_WORKERS are dropped, since
+# they would queue behind the others and stretch the route's time budget.
+SOLVER_STARTS = int(os.getenv("SOLVER_STARTS", "1"))
+MAX_SOLVER_STARTS = int(os.getenv("MAX_SOLVER_STARTS", "64"))
+
+# Routes with more stops than this are partitioned into clusters of at most
+# CLUSTER_MAX_STOPS, solved in parallel and stitched (0 disables decomposition)
+DECOMPOSE_MIN_STOPS = int(os.getenv("DECOMPOSE_MIN_STOPS", "300"))
+CLUSTER_MAX_STOPS = int(os.getenv("CLUSTER_MAX_STOPS", "150"))
+
+# Initial route construction when a request does not choose one
+ROUTE_CONSTRUCTION = os.getenv("ROUTE_CONSTRUCTION", "nearest_neighbor")
+
+# Manifests with more stops than this are ordered along a Hilbert curve from
+# coordinates alone, with no distance matrix (0 disables)
+HILBERT_ONLY_MIN_STOPS = int(os.getenv("HILBERT_ONLY_MIN_STOPS", "20000"))
+
+# Most routes a batch request may hold, and how many of them are solved at once
+MAX_BATCH_ROUTES = int(os.getenv("MAX_BATCH_ROUTES", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(max(SOLVER_WORKERS, 1) * 2)))
+
+# Background workers for submitted jobs, the most jobs queued or running at once, how
+# long finished jobs are kept, and the longest a status request may long-poll (stay
+# below the ingress timeout)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "1000"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+MAX_JOB_WAIT_SECONDS = float(os.getenv("MAX_JOB_WAIT_SECONDS", "25"))
+
+# Streaming solves report improvements at most this often
+STREAM_INTERVAL_MS = float(os.getenv("STREAM_INTERVAL_MS", "250"))
+
+solver_pool: Optional[ProcessPoolExecutor] = None
+job_queue: Optional[JobQueue] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the solver worker pool, job queue and pooled upstream connections for the server's lifetime"""
+    global solver_pool, job_queue
+    if SOLVER_WORKERS > 0:
+        # spawn avoids forking a process that already runs the event loop and threadpool
+        solver_pool = ProcessPoolExecutor(
+            max_workers=SOLVER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        # Start the workers now rather than on the first route request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(solver_pool, math.sqrt, 1.0) for _ in range(SOLVER_WORKERS)))
+    job_queue = JobQueue(run_route_job, JOB_WORKERS, MAX_QUEUED_JOBS, JOB_RETENTION_SECONDS)
+    await job_queue.start()
+    try:
+        yield
+    finally:
+        await job_queue.stop()
+        job_queue = None
+        if solver_pool is not None:
+            solver_pool.shutdown(cancel_futures=True)
+            solver_pool = None
+        await aclose_clients()
+        close_clients()
+
+app = FastAPI(title="Smart Route API", description="Route optimization API for deliveries", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -34,6 +154,13 @@ class GeocodeResponse(BaseModel):
 
 class RouteRequest(BaseModel):
     addresses: List[str]
+    distance_provider: Optional[str] = None
+    # Solver budget: keep improving the route for this long (e.g. 200 for re-plans, 10000 nightly)
+    time_limit_ms: Optional[int] = Field(default=None, gt=0, le=MAX_ROUTE_TIME_LIMIT_MS)
+    # Parallel solver starts; the best route across them is returned
+    starts: Optional[int] = Field(default=None, ge=1, le=MAX_SOLVER_STARTS)
+    # Initial route: greedy nearest neighbour, or the O(n log n) Hilbert curve order
+    construction: Optional[Literal["nearest_neighbor", "hilbert"]] = None
 
 class RouteResponse(BaseModel):
     coordinates: List[Tuple[float, float]]
@@ -41,155 +168,340 @@ class RouteResponse(BaseModel):
     total_distance_km: float
     original_addresses: List[str]
     optimized_addresses: List[str]
+    distance_provider: str
+    route_id: str
+
+class BatchRouteRequest(BaseModel):
+    routes: List[RouteRequest] = Field(min_length=1, max_length=MAX_BATCH_ROUTES)
+
+class BatchRouteResult(BaseModel):
+    # Position of the route in the request; exactly one of route and error is set
+    index: int
+    status_code: int = 200
+    route: Optional[RouteResponse] = None
+    error: Optional[str] = None
+
+class BatchRouteResponse(BaseModel):
+    results: List[BatchRouteResult]
+    succeeded: int
+    failed: int
+
+class RouteUpdateRequest(BaseModel):
+    # The route to change: a stored route id, or the route itself as returned by /optimize-route
+    route_id: Optional[str] = None
+    coordinates: List[Tuple[float, float]] = []
+    optimized_order: List[int] = []
+    original_addresses: List[str] = []
+    distance_provider: Optional[str] = None
+    # Stops to insert, and stops to drop (matched against original_addresses)
+    add: List[str] = []
+    remove: List[str] = []
+    # Stops to drop by position in original_addresses, for when the address first
+    # submitted differs from the formatted one the route holds
+    remove_stops: List[int] = []
+
+class JobResponse(BaseModel):
+    job_id: str
+    # queued, running, succeeded, failed or cancelled
+    status: str
+    # Current pipeline stage, and progress (0 to 1) through each one
+    stage: Optional[str] = None
+    progress: Dict[str, float]
+    result: Optional[RouteResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class DirectionsRequest(BaseModel):
+    addresses: List[str] = []
+    distance_provider: Optional[str] = None
+    route_id: Optional[str] = None
 
 class DirectionsResponse(BaseModel):
     directions: List[str]
 
 # Helper functions
-def geocode_address(address: str, api_key: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
-    """Geocode an address using Google Maps API"""
+async def geocode_address(address: str, api_key: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """Geocode an address using Google Maps API, consulting the persistent cache first"""
+    cache = get_geocode_cache()
+    cache_key = normalize_address(address)
+    cached = await run_in_threadpool(cache.get, cache_key)
+    if cached is not None:
+        lat, lng, formatted_address = cached
+        return lat, lng, formatted_address
+    
     url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {"address": address, "key": api_key}
     
     try:
-        resp = requests.get(url, params=params)
+        resp = await get_async_client(url).get(url, params=params)
         resp.raise_for_status()
         
         results = resp.json().get("results")
         if results:
             location = results[0]["geometry"]["location"]
             formatted_address = results[0]["formatted_address"]
+            # Only successful lookups are cached so transient failures are retried
+            await run_in_threadpool(cache.set, cache_key, [location["lat"], location["lng"], formatted_address])
             return location["lat"], location["lng"], formatted_address
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Geocoding error: {e}")
     
     return None, None, None
 
-def get_distance_matrix(coords: List[Tuple[float, float]], api_key: str) -> Optional[np.ndarray]:
-    """Get distance matrix using Google Maps API"""
-    if not coords:
-        return None
+async def geocode_addresses(
+    addresses: List[str],
+    api_key: str,
+    concurrency: int = GEOCODE_CONCURRENCY,
+    progress: Optional[Callable[[float], None]] = None
+) -> List[Tuple[Optional[float], Optional[float], Optional[str]]]:
+    """Geocode addresses concurrently, returning results in input order
+    
+    progress, if given, is called with the fraction done after each address.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = 0
     
-    origins = "|".join([f"{lat},{lng}" for lat, lng in coords])
-    destinations = origins
-    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+    async def geocode_one(address: str):
+        nonlocal done
+        async with semaphore:
+            result = await geocode_address(address, api_key)
+        done += 1
+        if progress is not None:
+            progress(done / len(addresses))
+        return result
+    
+    return await asyncio.gather(*(geocode_one(addr) for addr in addresses))
+
+async def fetch_leg_directions(origin: str, destination: str, api_key: str) -> List[str]:
+    """Fetch the steps of a single leg, raising if the upstream has no route"""
+    url = "https://maps.googleapis.com/maps/api/directions/json"
     params = {
-        "origins": origins,
-        "destinations": destinations,
+        "origin": origin,
+        "destination": destination,
         "key": api_key,
         "mode": "driving"
     }
     
-    try:
-        resp = requests.get(url, params=params)
-        resp.raise_for_status()
-        
-        data = resp.json()
-        n = len(coords)
-        matrix = np.zeros((n, n))
-        
-        for i, row in enumerate(data["rows"]):
-            for j, element in enumerate(row["elements"]):
-                if element["status"] == "OK":
-                    matrix[i][j] = element["distance"]["value"]
-                else:
-                    matrix[i][j] = np.inf
-        
-        return matrix
-    except requests.RequestException as e:
-        print(f"Distance matrix error: {e}")
-    
-    return None
-
-def calculate_angle(p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[float, float]) -> float:
-    """Calculate angle between three points"""
-    def to_vec(a, b):
-        return (b[0] - a[0], b[1] - a[1])
-    
-    v1 = to_vec(p2, p1)
-    v2 = to_vec(p2, p3)
-    angle1 = math.atan2(v1[1], v1[0])
-    angle2 = math.atan2(v2[1], v2[0])
-    angle = math.degrees(angle2 - angle1)
-    
-    # Normalize angle to [-180, 180]
-    while angle <= -180:
-        angle += 360
-    while angle > 180:
-        angle -= 360
-    
-    return angle
-
-def solve_tsp_nearest_neighbor_with_right_turn_penalty(
-    coords: List[Tuple[float, float]], 
-    matrix: np.ndarray, 
-    right_turn_penalty: float = 500
-) -> List[int]:
-    """Solve TSP using nearest neighbor with right turn penalty"""
-    n = len(matrix)
-    unvisited = set(range(1, n))
-    order = [0]
-    current = 0
-    prev = None
-    
-    while unvisited:
-        min_cost = float('inf')
-        next_city = None
-        
-        for city in unvisited:
-            cost = matrix[current][city]
-            
-            # If this is not the first move, check for right turn
-            if prev is not None:
-                angle = calculate_angle(coords[prev], coords[current], coords[city])
-                if -135 < angle < -45:  # Right turn
-                    cost += right_turn_penalty
-            
-            if cost < min_cost:
-                min_cost = cost
-                next_city = city
-        
-        order.append(next_city)
-        unvisited.remove(next_city)
-        prev = current
-        current = next_city
+    resp = await get_async_client(url).get(url, params=params)
+    resp.raise_for_status()
+    
+    data = resp.json()
+    if data["status"] != "OK":
+        raise ValueError(f"Directions status {data['status']}")
     
-    return order
+    steps = data["routes"][0]["legs"][0]["steps"]
+    legs = []
+    for step in steps:
+        # Remove HTML tags from instructions
+        instruction = re.sub('<[^<]+?>', '', step["html_instructions"])
+        legs.append(f"{instruction} ({step['distance']['text']}, {step['duration']['text']})")
+    
+    return legs
+
+def unavailable_leg_message(order: List[int], i: int) -> str:
+    return f"[Directions unavailable for leg {i + 1}: stop {order[i] + 1} to stop {order[i + 1] + 1}]"
 
-def get_route_directions(coords: List[Tuple[float, float]], order: List[int], api_key: str) -> List[str]:
-    """Get step-by-step directions for the route"""
+async def iter_route_directions(
+    coords: List[Tuple[float, float]],
+    order: List[int],
+    api_key: str
+) -> AsyncIterator[Tuple[int, Optional[List[str]]]]:
+    """Yield (leg index, steps) for each leg of the route as soon as it is fetched,
+    concurrently and in completion order; steps is None for a leg that failed
+    """
+    legs = [
+        (f"{coords[order[i]][0]},{coords[order[i]][1]}", f"{coords[order[i+1]][0]},{coords[order[i+1]][1]}")
+        for i in range(len(order) - 1)
+    ]
+    
+    semaphore = asyncio.Semaphore(max(1, DIRECTIONS_CONCURRENCY))
+    
+    async def fetch_leg(i: int) -> Tuple[int, Optional[List[str]]]:
+        async with semaphore:
+            try:
+                return i, await fetch_leg_directions(legs[i][0], legs[i][1], api_key)
+            except (httpx.HTTPError, KeyError, IndexError, ValueError) as e:
+                print(f"Directions error: {e}")
+                return i, None
+    
+    tasks = [asyncio.create_task(fetch_leg(i)) for i in range(len(legs))]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The consumer may stop early (a streaming client disconnecting)
+        for task in tasks:
+            task.cancel()
+
+async def get_route_directions(coords: List[Tuple[float, float]], order: List[int], api_key: str) -> List[str]:
+    """Get step-by-step directions for the route, fetching legs concurrently"""
     if not order or len(order) < 2:
         return []
     
-    directions = []
+    results: List[Optional[List[str]]] = [None] * (len(order) - 1)
+    async for i, steps in iter_route_directions(coords, order, api_key):
+        results[i] = steps
     
-    for i in range(len(order) - 1):
-        origin = f"{coords[order[i]][0]},{coords[order[i]][1]}"
-        destination = f"{coords[order[i+1]][0]},{coords[order[i+1]][1]}"
-        url = "https://maps.googleapis.com/maps/api/directions/json"
-        params = {
-            "origin": origin,
-            "destination": destination,
-            "key": api_key,
-            "mode": "driving"
-        }
-        
-        try:
-            resp = requests.get(url, params=params)
-            resp.raise_for_status()
-            
-            data = resp.json()
-            if data["status"] == "OK":
-                steps = data["routes"][0]["legs"][0]["steps"]
-                for step in steps:
-                    # Remove HTML tags from instructions
-                    instruction = re.sub('<[^<]+?>', '', step["html_instructions"])
-                    directions.append(f"{instruction} ({step['distance']['text']}, {step['duration']['text']})")
-        except requests.RequestException as e:
-            print(f"Directions error: {e}")
+    # Reassemble in route order, marking legs that could not be fetched
+    directions = []
+    for i, steps in enumerate(results):
+        if steps is None:
+            directions.append(unavailable_leg_message(order, i))
+        else:
+            directions.extend(steps)
     
     return directions
 
+async def get_route_matrix(
+    coords: List[Tuple[float, float]],
+    api_key: str,
+    provider_name: str,
+    needed: Optional[np.ndarray] = None
+) -> Tuple[Optional[np.ndarray], str]:
+    """Distance matrix from the named provider, falling back when it is unavailable
+    
+    needed optionally limits the entries fetched to those marked in an n x n mask.
+    """
+    matrix = await get_provider(provider_name).get_matrix(coords, api_key, needed)
+    
+    fallback = DISTANCE_FALLBACK_PROVIDER
+    if matrix is None and fallback and fallback != provider_name and fallback in available_providers():
+        print(f"Distance provider {provider_name} unavailable, falling back to {fallback}")
+        matrix = await get_provider(fallback).get_matrix(coords, api_key, needed)
+        provider_name = fallback
+    
+    return matrix, provider_name
+
+def route_content_hash(addresses: List[str], provider_name: str, solver: Optional[dict] = None) -> str:
+    """Stable id for the route produced by a given address list, provider and solver settings"""
+    payload = {"addresses": [normalize_address(addr) for addr in addresses], "distance_provider": provider_name}
+    if solver is not None:
+        payload["solver"] = solver
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()).hexdigest()
+
+def route_solver_settings(request: RouteRequest) -> dict:
+    """Every setting that can change the route solved for a request"""
+    return {**route_solve_kwargs(request), "starts": request.starts or SOLVER_STARTS}
+
+def route_request_id(request: RouteRequest, provider_name: str) -> str:
+    """Route id of an optimization request; different solver settings give different ids"""
+    return route_content_hash(request.addresses, provider_name, route_solver_settings(request))
+
+def canonical_route_request(request: RouteRequest, provider_name: str) -> Tuple[str, List[int]]:
+    """Cache key of a route request, and the permutation of its addresses into canonical order
+    
+    The first address is the start of the route and stays first. The rest form a
+    multiset, sorted by normalized address, so any ordering of the same stops gives
+    the same key. Solver settings and the provider are part of the key.
+    """
+    normalized = [normalize_address(addr) for addr in request.addresses]
+    permutation = [0] + sorted(range(1, len(normalized)), key=lambda i: normalized[i])
+    payload = json.dumps(
+        {
+            "addresses": [normalized[i] for i in permutation],
+            "distance_provider": provider_name,
+            "solver": route_solver_settings(request)
+        },
+        separators=(",", ":"),
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest(), permutation
+
+def remap_cached_route(canonical: dict, permutation: List[int], route_id: str) -> RouteResponse:
+    """A cached canonical-order result with its stop indices mapped back to the request's order"""
+    # Canonical position of each stop, in request order
+    positions = sorted(range(len(permutation)), key=lambda p: permutation[p])
+    return RouteResponse(
+        coordinates=[canonical["coordinates"][p] for p in positions],
+        optimized_order=[permutation[p] for p in canonical["optimized_order"]],
+        total_distance_km=canonical["total_distance_km"],
+        original_addresses=[canonical["original_addresses"][p] for p in positions],
+        optimized_addresses=canonical["optimized_addresses"],
+        distance_provider=canonical["distance_provider"],
+        route_id=route_id
+    )
+
+def route_etag(route: RouteResponse) -> str:
+    """Strong ETag of a route response body"""
+    payload = json.dumps(route.model_dump(), separators=(",", ":"), sort_keys=True)
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+async def run_in_solver_pool(func, *args, **kwargs):
+    """Run CPU-bound solver work off the event loop, in the worker pool when available"""
+    call = functools.partial(func, *args, **kwargs)
+    if solver_pool is None:
+        return await run_in_threadpool(call)
+    return await asyncio.get_running_loop().run_in_executor(solver_pool, call)
+
+async def solve_route_multi_start(coords: List[Tuple[float, float]], matrix: np.ndarray, starts: int, **solve_kwargs) -> List[int]:
+    """Run differently seeded solves across the solver pool and keep the cheapest route
+    
+    At most one start per pool worker runs, so the solve takes one time budget.
+    """
+    starts = min(starts, max(SOLVER_WORKERS, 1))
+    if starts <= 1 or len(coords) <= solve_kwargs.get("exact_max_stops", 0):
+        return await run_in_solver_pool(solve_route, coords, matrix, **solve_kwargs)
+    
+    # Workers read the matrix from shared memory rather than a pickled copy per start
+    with SharedMatrix(matrix) as shared:
+        results = await asyncio.gather(*(
+            run_in_solver_pool(solve_route_shared, shared.spec, coords, seed, **solve_kwargs)
+            for seed in range(starts)
+        ))
+    
+    return min(results, key=lambda result: result[0])[1]
+
+async def improving_routes(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    budget_ms: float,
+    **solve_kwargs
+) -> AsyncIterator[List[int]]:
+    """Yield the initial tour at once, then each better tour found within budget_ms
+    
+    Iterated local search runs in slices of STREAM_INTERVAL_MS on the solver pool,
+    each slice continuing from the best tour so far. Routes small enough for the
+    exact solver get the exact tour after the initial one.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    penalty = solve_kwargs["right_turn_penalty"]
+    
+    best = await run_in_solver_pool(
+        solve_route, coords, matrix, right_turn_penalty=penalty, construction=solve_kwargs["construction"]
+    )
+    best_cost = route_cost(coords, matrix, best, penalty)
+    yield best
+    
+    if len(coords) <= solve_kwargs["exact_max_stops"]:
+        order = await run_in_solver_pool(solve_route, coords, matrix, **solve_kwargs)
+        if route_cost(coords, matrix, order, penalty) < best_cost - 1e-6:
+            yield order
+        return
+    
+    k = solve_kwargs["candidate_neighbours"]
+    neighbours = candidate_lists(matrix, k) if k > 0 and len(coords) > max(CANDIDATE_LISTS_MIN_STOPS, k + 1) else None
+    seed = 0
+    while (remaining_ms := (deadline - time.perf_counter()) * 1000) > 1:
+        order = await run_in_solver_pool(
+            iterated_local_search, coords, matrix, best, penalty,
+            min(remaining_ms, STREAM_INTERVAL_MS), seed, None, neighbours
+        )
+        seed += 1
+        cost = route_cost(coords, matrix, order, penalty)
+        if cost < best_cost - 1e-6:
+            best, best_cost = order, cost
+            yield best
+
+def format_stream_event(event: dict, stream_format: str) -> str:
+    """One event as an NDJSON line or a Server-Sent Events message"""
+    data = json.dumps(event, separators=(",", ":"))
+    if stream_format == "ndjson":
+        return data + "\n"
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
 # API endpoints
 @app.get("/")
 async def root():
@@ -202,7 +514,7 @@ async def geocode(address: Address):
     if not api_key:
         raise HTTPException(status_code=500, detail="Google API key not configured")
     
-    lat, lng, formatted_address = geocode_address(address.address, api_key)
+    lat, lng, formatted_address = await geocode_address(address.address, api_key)
     
     if lat is None or lng is None:
         raise HTTPException(status_code=404, detail="Address not found")
@@ -214,8 +526,27 @@ async def geocode(address: Address):
     )
 
 @app.post("/optimize-route", response_model=RouteResponse)
-async def optimize_route(request: RouteRequest):
-    """Optimize route for given addresses"""
+async def optimize_route_endpoint(
+    request: RouteRequest,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None)
+):
+    """Optimize route for given addresses; If-None-Match with the route's ETag gets a 304"""
+    route = await optimize_route(request)
+    etag = route_etag(route)
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return route
+
+async def optimize_route(request: RouteRequest) -> RouteResponse:
+    """Optimize route for given addresses, answering repeated manifests from the response cache
+    
+    Requests are solved with their stops in canonical order and cached that way, so
+    a resubmission in any order is a hit; indices are remapped to its own order.
+    Only complete results are cached: every address geocoded and the requested
+    distance provider answered.
+    """
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="Google API key not configured")
@@ -223,12 +554,41 @@ async def optimize_route(request: RouteRequest):
     if len(request.addresses) < 2:
         raise HTTPException(status_code=400, detail="At least 2 addresses are required")
     
-    # Geocode all addresses
+    provider_name = requested_distance_provider(request)
+    cache_key, permutation = canonical_route_request(request, provider_name)
+    route_id = route_request_id(request, provider_name)
+    
+    cache = get_response_cache()
+    cached = await run_in_threadpool(cache.get, cache_key)
+    if cached is None:
+        geocoded = await geocode_addresses(request.addresses, api_key)
+        if not all(lat is not None and lng is not None for lat, lng, _ in geocoded):
+            # Failed lookups may be transient, so the result is not cached. Solving in
+            # request order keeps the first stop that geocoded as the start.
+            return await optimize_geocoded_route(request, geocoded, api_key)
+        
+        canonical = request.model_copy(update={"addresses": [request.addresses[i] for i in permutation]})
+        solved = await optimize_geocoded_route(canonical, [geocoded[i] for i in permutation], api_key, store=False)
+        cached = solved.model_dump()
+        # A provider fallback is a degraded answer; retries should get the real one
+        if solved.distance_provider == provider_name:
+            await run_in_threadpool(cache.set, cache_key, cached)
+    
+    route = remap_cached_route(cached, permutation, route_id)
+    # Keep the result so /get-directions can reuse it instead of re-optimizing
+    await run_in_threadpool(get_route_store().set, route.route_id, route.model_dump())
+    
+    return route
+
+def geocoded_stops(
+    addresses: List[str],
+    geocoded: List[Tuple[Optional[float], Optional[float], Optional[str]]]
+) -> Tuple[List[Tuple[float, float]], List[str]]:
+    """Coordinates and formatted addresses of the stops that geocoded, in request order"""
     coords = []
     valid_addresses = []
     
-    for addr in request.addresses:
-        lat, lng, formatted_addr = geocode_address(addr, api_key)
+    for addr, (lat, lng, formatted_addr) in zip(addresses, geocoded):
         if lat is not None and lng is not None:
             coords.append((lat, lng))
             valid_addresses.append(formatted_addr or addr)
@@ -236,40 +596,399 @@ async def optimize_route(request: RouteRequest):
     if len(coords) < 2:
         raise HTTPException(status_code=400, detail="Could not geocode enough addresses")
     
-    # Get distance matrix
-    matrix = get_distance_matrix(coords, api_key)
-    if matrix is None:
-        raise HTTPException(status_code=500, detail="Could not retrieve distance matrix")
+    return coords, valid_addresses
+
+def requested_distance_provider(request: RouteRequest) -> str:
+    provider_name = request.distance_provider or DISTANCE_PROVIDER
+    if provider_name not in available_providers():
+        raise HTTPException(status_code=400, detail=f"Unknown distance provider: {provider_name}")
+    return provider_name
+
+def route_solve_kwargs(request: RouteRequest) -> dict:
+    """solve_route settings for a request"""
+    return dict(
+        right_turn_penalty=500,
+        local_search_time_limit_ms=LOCAL_SEARCH_TIME_LIMIT_MS,
+        exact_max_stops=EXACT_SOLVER_MAX_STOPS,
+        exact_time_limit_ms=EXACT_SOLVER_TIME_LIMIT_MS,
+        exact_max_bytes=EXACT_SOLVER_MAX_MEMORY_MB * 1024 * 1024,
+        time_limit_ms=request.time_limit_ms,
+        construction=request.construction or ROUTE_CONSTRUCTION,
+        candidate_neighbours=LOCAL_SEARCH_NEIGHBOURS
+    )
+
+def needs_full_matrix(n: int) -> bool:
+    """Whether a route of n stops is solved against one n x n matrix (not decomposed or curve-ordered)"""
+    return not (HILBERT_ONLY_MIN_STOPS and n > HILBERT_ONLY_MIN_STOPS) and not (DECOMPOSE_MIN_STOPS and n > DECOMPOSE_MIN_STOPS)
+
+async def optimize_geocoded_route(
+    request: RouteRequest,
+    geocoded: List[Tuple[Optional[float], Optional[float], Optional[str]]],
+    api_key: str,
+    report: Optional[Callable[[str], None]] = None,
+    store: bool = True
+) -> RouteResponse:
+    """Solve and store a route whose addresses are already geocoded, in request order
     
-    # Optimize route
-    order = solve_tsp_nearest_neighbor_with_right_turn_penalty(coords, matrix)
+    report, if given, is called with each pipeline stage ("matrix", "solving") as it starts.
+    store=False leaves storing to the caller, for results it still has to remap.
+    """
+    report = report or (lambda stage: None)
+    coords, valid_addresses = geocoded_stops(request.addresses, geocoded)
+    requested_provider = requested_distance_provider(request)
+    solve_kwargs = route_solve_kwargs(request)
     
-    # Calculate total distance
-    total_distance = sum(matrix[order[i]][order[i+1]] for i in range(len(order)-1))
+    if HILBERT_ONLY_MIN_STOPS and len(coords) > HILBERT_ONLY_MIN_STOPS:
+        # Huge manifest: curve order from coordinates, distance estimated leg by leg
+        report("solving")
+        order = await run_in_solver_pool(solve_hilbert, coords)
+        total_distance = float(haversine_legs([coords[i] for i in order], HAVERSINE_DETOUR_FACTOR).sum())
+        provider_name = "haversine"
+    elif DECOMPOSE_MIN_STOPS and len(coords) > DECOMPOSE_MIN_STOPS:
+        # Too many stops for one n x n matrix: solve cluster by cluster, fetching
+        # each cluster's matrix as part of the solve
+        report("solving")
+        provider_names = set()
+        
+        async def get_matrix(sub_coords: List[Tuple[float, float]]) -> Optional[np.ndarray]:
+            sub_matrix, name = await get_route_matrix(sub_coords, api_key, requested_provider)
+            provider_names.add(name)
+            return sub_matrix
+        
+        try:
+            order, total_distance = await solve_decomposed(
+                coords, CLUSTER_MAX_STOPS, get_matrix, run_in_solver_pool, max(SOLVER_WORKERS, 1), **solve_kwargs
+            )
+        except ValueError as e:
+            print(f"Decomposed solve error: {e}")
+            raise HTTPException(status_code=500, detail="Could not retrieve distance matrix")
+        # Report the fallback provider if any part of the route needed it
+        provider_name = next((name for name in provider_names if name != requested_provider), requested_provider)
+    else:
+        report("matrix")
+        matrix, provider_name = await get_route_matrix(coords, api_key, requested_provider)
+        if matrix is None:
+            raise HTTPException(status_code=500, detail="Could not retrieve distance matrix")
+        
+        # Optimize route
+        report("solving")
+        order = await solve_route_multi_start(coords, matrix, request.starts or SOLVER_STARTS, **solve_kwargs)
+        
+        # Calculate total distance
+        total_distance = sum(matrix[order[i]][order[i+1]] for i in range(len(order)-1))
     
     # Prepare optimized addresses
     optimized_addresses = [valid_addresses[i] for i in order]
     
-    return RouteResponse(
+    route = RouteResponse(
         coordinates=coords,
         optimized_order=order,
         total_distance_km=round(total_distance / 1000, 2),
         original_addresses=valid_addresses,
-        optimized_addresses=optimized_addresses
+        optimized_addresses=optimized_addresses,
+        distance_provider=provider_name,
+        route_id=route_request_id(request, requested_provider)
     )
+    
+    if store:
+        # Keep the result so /get-directions can reuse it instead of re-optimizing
+        await run_in_threadpool(get_route_store().set, route.route_id, route.model_dump())
+    
+    return route
+
+@app.post("/optimize-routes/batch", response_model=BatchRouteResponse)
+async def optimize_routes_batch(request: BatchRouteRequest):
+    """Optimize many routes in one call, geocoding each distinct address once"""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Google API key not configured")
+    
+    # Deduplicate across the batch with the geocode cache's key
+    unique = {}
+    for route_request in request.routes:
+        if len(route_request.addresses) >= 2:
+            for addr in route_request.addresses:
+                unique.setdefault(normalize_address(addr), addr)
+    geocoded = dict(zip(unique, await geocode_addresses(list(unique.values()), api_key)))
+    
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+    
+    async def optimize_one(index: int, route_request: RouteRequest) -> BatchRouteResult:
+        try:
+            if len(route_request.addresses) < 2:
+                raise HTTPException(status_code=400, detail="At least 2 addresses are required")
+            async with semaphore:
+                route = await optimize_geocoded_route(
+                    route_request,
+                    [geocoded[normalize_address(addr)] for addr in route_request.addresses],
+                    api_key
+                )
+            return BatchRouteResult(index=index, route=route)
+        except HTTPException as e:
+            return BatchRouteResult(index=index, status_code=e.status_code, error=e.detail)
+        except Exception as e:
+            # One bad route must not fail the rest of the batch
+            print(f"Batch route {index} error: {e!r}")
+            return BatchRouteResult(index=index, status_code=500, error="Route optimization failed")
+    
+    results = await asyncio.gather(*(optimize_one(i, r) for i, r in enumerate(request.routes)))
+    succeeded = sum(result.route is not None for result in results)
+    return BatchRouteResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+@app.post("/optimize-route/stream")
+async def optimize_route_stream(request: RouteRequest, format: Literal["sse", "ndjson"] = "sse"):
+    """Optimize a route, streaming each better tour as it is found
+    
+    Emits a "solution" event for the initial tour and for every improvement, then a
+    "done" event with the final route (stored like /optimize-route's). The client can
+    stop reading at any point and keep the last solution. Time budget: time_limit_ms,
+    or the local search budget. Routes too large for one matrix emit only "done".
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Google API key not configured")
+    
+    if len(request.addresses) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 addresses are required")
+    
+    # Fail before the stream starts for anything that would fail /optimize-route
+    geocoded = await geocode_addresses(request.addresses, api_key)
+    coords, valid_addresses = geocoded_stops(request.addresses, geocoded)
+    requested_provider = requested_distance_provider(request)
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    
+    if not needs_full_matrix(len(coords)):
+        route = await optimize_geocoded_route(request, geocoded, api_key)
+        done = format_stream_event({"type": "done", "route": route.model_dump()}, format)
+        return StreamingResponse(iter([done]), media_type=media_type)
+    
+    matrix, provider_name = await get_route_matrix(coords, api_key, requested_provider)
+    if matrix is None:
+        raise HTTPException(status_code=500, detail="Could not retrieve distance matrix")
+    solve_kwargs = route_solve_kwargs(request)
+    
+    async def events():
+        started = time.perf_counter()
+        order = None
+        sequence = 0
+        try:
+            async for order in improving_routes(
+                coords, matrix, request.time_limit_ms or LOCAL_SEARCH_TIME_LIMIT_MS, **solve_kwargs
+            ):
+                sequence += 1
+                yield format_stream_event({
+                    "type": "solution",
+                    "sequence": sequence,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000),
+                    "optimized_order": order,
+                    "total_distance_km": round(sum(matrix[a][b] for a, b in zip(order, order[1:])) / 1000, 2),
+                    "right_turns": count_right_turns(coords, order)
+                }, format)
+        except Exception as e:
+            print(f"Streaming solve error: {e!r}")
+            yield format_stream_event({"type": "error", "error": "Route optimization failed"}, format)
+            if order is None:
+                return
+        
+        route = RouteResponse(
+            coordinates=coords,
+            optimized_order=order,
+            total_distance_km=round(sum(matrix[a][b] for a, b in zip(order, order[1:])) / 1000, 2),
+            original_addresses=valid_addresses,
+            optimized_addresses=[valid_addresses[i] for i in order],
+            distance_provider=provider_name,
+            route_id=route_request_id(request, requested_provider)
+        )
+        await run_in_threadpool(get_route_store().set, route.route_id, route.model_dump())
+        yield format_stream_event({"type": "done", "route": route.model_dump()}, format)
+    
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.patch("/optimize-route", response_model=RouteResponse)
+async def update_optimized_route(request: RouteUpdateRequest):
+    """Insert and remove stops in an optimized route without re-solving it"""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Google API key not configured")
+    
+    if request.route_id:
+        stored = await run_in_threadpool(get_route_store().get, request.route_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Route not found or expired")
+        route = RouteResponse(**stored)
+        coords, order, addresses = route.coordinates, route.optimized_order, route.original_addresses
+        requested_provider = request.distance_provider or route.distance_provider
+    else:
+        coords, order, addresses = request.coordinates, request.optimized_order, request.original_addresses
+        if not coords or len(addresses) != len(coords) or sorted(order) != list(range(len(coords))):
+            raise HTTPException(
+                status_code=400,
+                detail="Either route_id or matching coordinates, optimized_order and original_addresses is required"
+            )
+        requested_provider = request.distance_provider or DISTANCE_PROVIDER
+    
+    if requested_provider not in available_providers():
+        raise HTTPException(status_code=400, detail=f"Unknown distance provider: {requested_provider}")
+    if not request.add and not request.remove and not request.remove_stops:
+        raise HTTPException(status_code=400, detail="Nothing to add or remove")
+    
+    # Match removals case and whitespace insensitively, like the caches do
+    index_by_address = {normalize_address(addr): i for i, addr in enumerate(addresses)}
+    unknown = [addr for addr in request.remove if normalize_address(addr) not in index_by_address]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Not on the route: {', '.join(unknown)} (remove_stops takes positions in original_addresses)"
+        )
+    out_of_range = [i for i in request.remove_stops if not 0 <= i < len(addresses)]
+    if out_of_range:
+        raise HTTPException(status_code=400, detail=f"No such stops: {', '.join(map(str, out_of_range))}")
+    removed = [index_by_address[normalize_address(addr)] for addr in request.remove] + list(request.remove_stops)
+    
+    added_coords = []
+    added_addresses = []
+    geocoded = await geocode_addresses(request.add, api_key)
+    for addr, (lat, lng, formatted_addr) in zip(request.add, geocoded):
+        if lat is None or lng is None:
+            raise HTTPException(status_code=400, detail=f"Could not geocode: {addr}")
+        added_coords.append((lat, lng))
+        added_addresses.append(formatted_addr or addr)
+    
+    if len(coords) - len(set(removed)) + len(added_coords) < 2:
+        raise HTTPException(status_code=400, detail="At least 2 addresses are required")
+    
+    provider_names = set()
+    
+    async def get_matrix(sub_coords: List[Tuple[float, float]], needed: np.ndarray) -> Optional[np.ndarray]:
+        sub_matrix, name = await get_route_matrix(sub_coords, api_key, requested_provider, needed)
+        provider_names.add(name)
+        return sub_matrix
+    
+    try:
+        new_coords, new_order, kept, total_distance = await update_route(
+            [tuple(c) for c in coords], order, removed, added_coords, get_matrix, run_in_solver_pool,
+            right_turn_penalty=500
+        )
+    except ValueError as e:
+        print(f"Route update error: {e}")
+        raise HTTPException(status_code=500, detail="Could not retrieve distance matrix")
+    provider_name = next((name for name in provider_names if name != requested_provider), requested_provider)
+    
+    new_addresses = [addresses[i] for i in kept] + added_addresses
+    route = RouteResponse(
+        coordinates=new_coords,
+        optimized_order=new_order,
+        total_distance_km=round(total_distance / 1000, 2),
+        original_addresses=new_addresses,
+        optimized_addresses=[new_addresses[i] for i in new_order],
+        distance_provider=provider_name,
+        # No solver settings: an updated route is repaired rather than solved from them
+        route_id=route_content_hash(new_addresses, requested_provider)
+    )
+    
+    await run_in_threadpool(get_route_store().set, route.route_id, route.model_dump())
+    
+    return route
+
+async def run_route_job(job: Job) -> RouteResponse:
+    """Job queue handler: the /optimize-route pipeline, reporting each stage"""
+    request: RouteRequest = job.payload
+    api_key = os.getenv("GOOGLE_API_KEY")
+    try:
+        if not api_key:
+            raise HTTPException(status_code=500, detail="Google API key not configured")
+        if len(request.addresses) < 2:
+            raise HTTPException(status_code=400, detail="At least 2 addresses are required")
+        
+        job.report("geocoding")
+        geocoded = await geocode_addresses(
+            request.addresses, api_key, progress=lambda done: job.report("geocoding", done)
+        )
+        return await optimize_geocoded_route(request, geocoded, api_key, report=job.report)
+    except HTTPException as e:
+        raise JobError(e.detail, e.status_code)
+
+def job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        stage=job.stage,
+        progress=job.progress,
+        result=job.result,
+        error=job.error,
+        status_code=job.status_code,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+def running_job_queue() -> JobQueue:
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job queue not running")
+    return job_queue
+
+def get_job_or_404(job_id: str) -> Job:
+    job = running_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: RouteRequest):
+    """Queue a route optimization and return its job id at once"""
+    queue = running_job_queue()
+    try:
+        job = queue.submit(request)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many jobs queued, retry later")
+    return job_response(job)
+
+@app.get("/jobs")
+async def job_stats():
+    """Jobs held per status, with the worker count and the queue's capacity"""
+    return running_job_queue().stats()
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = Query(0, ge=0)):
+    """Job status and, once finished, its result; wait > 0 long-polls for that many seconds"""
+    job = get_job_or_404(job_id)
+    await job_queue.wait(job, min(wait, MAX_JOB_WAIT_SECONDS))
+    return job_response(job)
+
+@app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    get_job_or_404(job_id)
+    return job_response(job_queue.cancel(job_id))
+
+async def resolve_directions_route(request: DirectionsRequest) -> RouteResponse:
+    """The route a directions request refers to: stored by id or address hash, or optimized now"""
+    route_request = RouteRequest(addresses=request.addresses, distance_provider=request.distance_provider)
+    route_id = request.route_id
+    if route_id is None and request.addresses:
+        route_id = route_request_id(route_request, request.distance_provider or DISTANCE_PROVIDER)
+    
+    stored = await run_in_threadpool(get_route_store().get, route_id) if route_id else None
+    if stored is not None:
+        return RouteResponse(**stored)
+    if request.addresses:
+        # Not stored (or expired): optimize the route first, with the default solver settings
+        return await optimize_route(route_request)
+    if request.route_id:
+        raise HTTPException(status_code=404, detail="Route not found or expired")
+    raise HTTPException(status_code=400, detail="Either route_id or addresses is required")
 
 @app.post("/get-directions", response_model=DirectionsResponse)
-async def get_directions(request: RouteRequest):
-    """Get step-by-step directions for optimized route"""
+async def get_directions(request: DirectionsRequest):
+    """Get step-by-step directions for an optimized route, reusing a stored result when possible"""
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="Google API key not configured")
     
-    # First optimize the route
-    route_response = await optimize_route(request)
+    route_response = await resolve_directions_route(request)
     
     # Get directions
-    directions = get_route_directions(
+    directions = await get_route_directions(
         route_response.coordinates, 
         route_response.optimized_order, 
         api_key
@@ -277,6 +996,61 @@ async def get_directions(request: RouteRequest):
     
     return DirectionsResponse(directions=directions)
 
+@app.post("/get-directions/stream")
+async def get_directions_stream(request: DirectionsRequest, format: Literal["sse", "ndjson"] = "sse"):
+    """Stream the directions of an optimized route leg by leg, as each one resolves
+    
+    A "route" event announces the route and its number of legs. Then comes one "leg"
+    event per leg, in completion order; leg is its 0-based position in the route, so
+    ordering by it rebuilds the /get-directions list. A "done" event closes the stream.
+    """
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="Google API key not configured")
+    
+    route = await resolve_directions_route(request)
+    order = route.optimized_order
+    leg_count = max(len(order) - 1, 0)
+    
+    async def events():
+        yield format_stream_event({
+            "type": "route",
+            "route_id": route.route_id,
+            "legs": leg_count,
+            "optimized_order": order,
+            "optimized_addresses": route.optimized_addresses
+        }, format)
+        
+        failed = 0
+        async for i, steps in iter_route_directions(route.coordinates, order, api_key):
+            failed += steps is None
+            yield format_stream_event({
+                "type": "leg",
+                "leg": i,
+                "legs": leg_count,
+                "from_stop": order[i],
+                "to_stop": order[i + 1],
+                "from_address": route.optimized_addresses[i],
+                "to_address": route.optimized_addresses[i + 1],
+                "available": steps is not None,
+                "steps": steps if steps is not None else [unavailable_leg_message(order, i)]
+            }, format)
+        
+        yield format_stream_event({"type": "done", "legs": leg_count, "failed": failed}, format)
+    
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters and size of the server-side caches"""
+    return {
+        "geocode": get_geocode_cache().stats(),
+        "legs": get_leg_cache().stats(),
+        "routes": get_route_store().stats(),
+        "responses": get_response_cache().stats()
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
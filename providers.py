@@ -0,0 +1,327 @@
+import math
+import os
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from http_client import get_async_client
+from cache import get_leg_cache, leg_cache_key
+from road_graph import RoadGraph
+
+# Distance Matrix API per-request limits
+MATRIX_MAX_ORIGINS = 25
+MATRIX_MAX_DESTINATIONS = 25
+MATRIX_MAX_ELEMENTS = 100
+
+# Parallelism and retry policy for matrix tiles
+MATRIX_CONCURRENCY = int(os.getenv("MATRIX_CONCURRENCY", "8"))
+MATRIX_TILE_RETRIES = int(os.getenv("MATRIX_TILE_RETRIES", "2"))
+MATRIX_RETRY_BACKOFF = float(os.getenv("MATRIX_RETRY_BACKOFF", "0.5"))
+
+# Mean Earth radius in metres
+EARTH_RADIUS_M = 6371008.8
+
+# Multiplier applied to great-circle distances to approximate road detours
+HAVERSINE_DETOUR_FACTOR = float(os.getenv("HAVERSINE_DETOUR_FACTOR", "1.0"))
+
+# Graph directory written by `python road_graph.py <extract.osm.pbf> <dir>`
+OSM_GRAPH_PATH = os.getenv("OSM_GRAPH_PATH", "")
+
+def plan_matrix_tiles(n_origins: int, n_destinations: int) -> List[Tuple[List[int], List[int]]]:
+    """Split an origins x destinations matrix into the fewest tiles within the upstream limits"""
+    best_rows, best_cols, best_count = 1, 1, None
+    for rows in range(1, min(n_origins, MATRIX_MAX_ORIGINS) + 1):
+        cols = min(n_destinations, MATRIX_MAX_DESTINATIONS, MATRIX_MAX_ELEMENTS // rows)
+        count = math.ceil(n_origins / rows) * math.ceil(n_destinations / cols)
+        if best_count is None or count < best_count:
+            best_rows, best_cols, best_count = rows, cols, count
+    
+    return [
+        (list(range(r, min(r + best_rows, n_origins))), list(range(c, min(c + best_cols, n_destinations))))
+        for r in range(0, n_origins, best_rows)
+        for c in range(0, n_destinations, best_cols)
+    ]
+
+def plan_missing_tiles(missing: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+    """Cover the missing off-diagonal pairs with compliant tiles that never include the diagonal
+
+    Every missing pair is in exactly one tile, since the upstream bills per element.
+    """
+    n = len(missing)
+    # Stops with no cached legs at all, e.g. every stop on a cold cache or a newly added stop
+    fresh = [i for i in range(n) if missing[i].sum() == n - 1]
+    fresh_set = set(fresh)
+    known = [i for i in range(n) if i not in fresh_set]
+    groups = []
+    
+    # Fresh stops among themselves: dense blocks against the other fresh stops, then
+    # each block's internal pairs one origin at a time, so every pair is billed once
+    block_size = math.isqrt(MATRIX_MAX_ELEMENTS)
+    for start in range(0, len(fresh), block_size):
+        block = fresh[start:start + block_size]
+        others = fresh[:start] + fresh[start + block_size:]
+        if others:
+            groups.append((block, others))
+        groups.extend(([i], [j for j in block if j != i]) for i in block if len(block) > 1)
+    
+    # Fresh stops to and from the known ones
+    if fresh and known:
+        groups.append((fresh, known))
+    
+    # Known stops share tiles with every other stop missing the same destinations
+    by_destinations = {}
+    for i in known:
+        destinations = tuple(int(j) for j in np.flatnonzero(missing[i]))
+        if destinations:
+            by_destinations.setdefault(destinations, []).append(i)
+    groups.extend((origins, list(destinations)) for destinations, origins in by_destinations.items())
+    
+    return [
+        ([origins[r] for r in rows], [destinations[c] for c in cols])
+        for origins, destinations in groups
+        for rows, cols in plan_matrix_tiles(len(origins), len(destinations))
+    ]
+
+async def fetch_matrix_tile(
+    origins: List[Tuple[float, float]],
+    destinations: List[Tuple[float, float]],
+    api_key: str,
+    mode: str = "driving"
+) -> np.ndarray:
+    """Fetch one Distance Matrix tile, raising on any request-level failure"""
+    url = "https://maps.googleapis.com/maps/api/distancematrix/json"
+    params = {
+        "origins": "|".join([f"{lat},{lng}" for lat, lng in origins]),
+        "destinations": "|".join([f"{lat},{lng}" for lat, lng in destinations]),
+        "key": api_key,
+        "mode": mode
+    }
+    
+    resp = await get_async_client(url).get(url, params=params)
+    resp.raise_for_status()
+    
+    data = resp.json()
+    if data.get("status", "OK") != "OK":
+        raise ValueError(f"Distance matrix status {data['status']}")
+    
+    tile = np.full((len(origins), len(destinations)), np.inf)
+    for i, row in enumerate(data["rows"]):
+        for j, element in enumerate(row["elements"]):
+            if element["status"] == "OK":
+                tile[i][j] = element["distance"]["value"]
+    
+    return tile
+
+async def get_distance_matrix(
+    coords: List[Tuple[float, float]],
+    api_key: str,
+    mode: str = "driving",
+    needed: Optional[np.ndarray] = None
+) -> Optional[np.ndarray]:
+    """Get distance matrix using Google Maps API, fetching only legs missing from the cache
+    
+    With needed (an n x n boolean mask) only those entries are looked up or fetched;
+    the rest of the matrix is NaN.
+    """
+    if not coords:
+        return None
+    
+    n = len(coords)
+    missing = ~np.eye(n, dtype=bool)
+    if needed is not None:
+        missing &= needed
+    matrix = np.where(missing | np.eye(n, dtype=bool), 0.0, np.nan)
+    
+    cache = get_leg_cache()
+    keys = {
+        (int(i), int(j)): leg_cache_key(coords[i], coords[j], mode)
+        for i, j in zip(*np.nonzero(missing))
+    }
+    cached = await run_in_threadpool(cache.get_many, keys.values())
+    for (i, j), key in keys.items():
+        if key in cached:
+            matrix[i][j] = cached[key]
+            missing[i][j] = False
+    
+    pending = plan_missing_tiles(missing)
+    semaphore = asyncio.Semaphore(max(1, MATRIX_CONCURRENCY))
+    
+    async def fetch_tile(rows: List[int], cols: List[int]) -> np.ndarray:
+        async with semaphore:
+            return await fetch_matrix_tile(
+                [coords[i] for i in rows],
+                [coords[j] for j in cols],
+                api_key,
+                mode
+            )
+    
+    for attempt in range(MATRIX_TILE_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            await asyncio.sleep(MATRIX_RETRY_BACKOFF * 2 ** (attempt - 1))
+        
+        results = await asyncio.gather(
+            *(fetch_tile(rows, cols) for rows, cols in pending),
+            return_exceptions=True
+        )
+        
+        # Only tiles that failed this round are retried
+        failed = []
+        fetched = {}
+        for (rows, cols), tile in zip(pending, results):
+            if isinstance(tile, (httpx.HTTPError, KeyError, ValueError)):
+                print(f"Distance matrix error: {tile}")
+                failed.append((rows, cols))
+                continue
+            if isinstance(tile, BaseException):
+                raise tile
+            
+            matrix[np.ix_(rows, cols)] = tile
+            for r, i in enumerate(rows):
+                for c, j in enumerate(cols):
+                    # Unroutable pairs are not cached so they are retried next time
+                    if np.isfinite(tile[r][c]):
+                        fetched[keys[(i, j)]] = float(tile[r][c])
+        
+        pending = failed
+        await run_in_threadpool(cache.set_many, fetched)
+    
+    if pending:
+        return None
+    
+    return matrix
+
+def haversine_matrix(coords: List[Tuple[float, float]], detour_factor: float = 1.0) -> np.ndarray:
+    """Great-circle distance matrix in metres, computed in one vectorized pass"""
+    points = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+    lat = points[:, 0]
+    lng = points[:, 1]
+    
+    sin_dlat = np.sin((lat[:, None] - lat[None, :]) / 2)
+    sin_dlng = np.sin((lng[:, None] - lng[None, :]) / 2)
+    a = sin_dlat ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * sin_dlng ** 2
+    
+    return 2 * EARTH_RADIUS_M * detour_factor * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def haversine_legs(coords: List[Tuple[float, float]], detour_factor: float = 1.0) -> np.ndarray:
+    """Great-circle distance in metres of each consecutive leg along coords"""
+    points = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+    lat = points[:, 0]
+    lng = points[:, 1]
+    
+    sin_dlat = np.sin(np.diff(lat) / 2)
+    sin_dlng = np.sin(np.diff(lng) / 2)
+    a = sin_dlat ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * sin_dlng ** 2
+    
+    return 2 * EARTH_RADIUS_M * detour_factor * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class DistanceProvider(ABC):
+    """Source of the origin x destination distance matrix used by the solvers"""
+    name: str = ""
+    
+    @abstractmethod
+    async def get_matrix(
+        self,
+        coords: List[Tuple[float, float]],
+        api_key: str,
+        needed: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """Return an n x n matrix of distances in metres, or None if unavailable
+        
+        needed optionally marks the only entries the caller will read, so providers
+        that pay per element can skip the rest (leaving them NaN).
+        """
+
+class GoogleDistanceProvider(DistanceProvider):
+    """Road distances from the Google Distance Matrix API"""
+    name = "google"
+    
+    def __init__(self, mode: str = "driving"):
+        self.mode = mode
+    
+    async def get_matrix(
+        self,
+        coords: List[Tuple[float, float]],
+        api_key: str,
+        needed: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        return await get_distance_matrix(coords, api_key, self.mode, needed)
+
+class HaversineDistanceProvider(DistanceProvider):
+    """Offline great-circle distances, optionally scaled by a road-detour multiplier"""
+    name = "haversine"
+    
+    def __init__(self, detour_factor: float = HAVERSINE_DETOUR_FACTOR):
+        self.detour_factor = detour_factor
+    
+    async def get_matrix(
+        self,
+        coords: List[Tuple[float, float]],
+        api_key: str,
+        needed: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        if not coords:
+            return None
+        return haversine_matrix(coords, self.detour_factor)
+
+class OsmDistanceProvider(DistanceProvider):
+    """Fastest-route road distances from a local OpenStreetMap routing graph"""
+    name = "osm"
+    
+    def __init__(self, graph_path: str = OSM_GRAPH_PATH):
+        self.graph_path = graph_path
+        self._graph: Optional[RoadGraph] = None
+    
+    def _distances(self, coords: List[Tuple[float, float]]) -> Optional[np.ndarray]:
+        if self._graph is None:
+            self._graph = RoadGraph(self.graph_path)
+        matrices = self._graph.distance_matrix(coords)
+        if matrices is None:
+            print("Stop outside the OSM graph's coverage")
+            return None
+        return matrices[0]
+    
+    async def get_matrix(
+        self,
+        coords: List[Tuple[float, float]],
+        api_key: str,
+        needed: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        if not coords:
+            return None
+        if not self.graph_path:
+            print("OSM graph not configured, set OSM_GRAPH_PATH")
+            return None
+        
+        try:
+            return await run_in_threadpool(self._distances, coords)
+        except OSError as e:
+            print(f"OSM graph error: {e}")
+        
+        return None
+
+_provider_factories: Dict[str, Callable[[], DistanceProvider]] = {
+    GoogleDistanceProvider.name: GoogleDistanceProvider,
+    HaversineDistanceProvider.name: HaversineDistanceProvider,
+    OsmDistanceProvider.name: OsmDistanceProvider,
+}
+_providers: Dict[str, DistanceProvider] = {}
+
+def register_provider(name: str, factory: Callable[[], DistanceProvider]) -> None:
+    """Make a provider selectable by name"""
+    _provider_factories[name] = factory
+    _providers.pop(name, None)
+
+def available_providers() -> List[str]:
+    return sorted(_provider_factories)
+
+def get_provider(name: str) -> DistanceProvider:
+    """Shared provider instance by name, raising KeyError for unknown names"""
+    if name not in _providers:
+        _providers[name] = _provider_factories[name]()
+    return _providers[name]
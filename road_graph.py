@@ -0,0 +1,639 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Fallback speeds (km/h) for drivable highway classes when a way has no usable maxspeed
+HIGHWAY_SPEEDS_KMH = {
+    "motorway": 90, "motorway_link": 45,
+    "trunk": 70, "trunk_link": 40,
+    "primary": 50, "primary_link": 30,
+    "secondary": 40, "secondary_link": 25,
+    "tertiary": 35, "tertiary_link": 20,
+    "unclassified": 25,
+    "residential": 20,
+    "living_street": 10,
+    "service": 15,
+    "road": 20,
+}
+
+# Settled-node budget for witness searches during contraction; lower is faster
+# to build but adds more shortcuts
+WITNESS_SETTLE_LIMIT = 60
+
+# Size of a spatial index cell in degrees (roughly 1 km)
+GRID_CELL_DEG = 0.01
+
+EARTH_RADIUS_M = 6371008.8
+
+GRAPH_ARRAYS = (
+    "lat", "lng",
+    "fwd_indptr", "fwd_head", "fwd_time", "fwd_dist",
+    "bwd_indptr", "bwd_head", "bwd_time", "bwd_dist",
+    "grid_keys", "grid_nodes",
+)
+
+def _haversine(lat1, lng1, lat2, lng2):
+    """Element-wise great-circle distance in metres"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _parse_maxspeed(value: Optional[str]) -> Optional[float]:
+    """maxspeed tag in km/h, or None when it is missing or symbolic"""
+    if not value:
+        return None
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*(mph|km/h|kmh)?\s*$", value)
+    if not match:
+        return None
+    speed = float(match.group(1))
+    return speed * 1.609344 if match.group(2) == "mph" else speed
+
+def _oneway_direction(tags, highway: str) -> int:
+    """1 for forward-only, -1 for reverse-only, 0 for both directions"""
+    oneway = tags.get("oneway")
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1":
+        return -1
+    if oneway == "no":
+        return 0
+    if highway in ("motorway", "motorway_link") or tags.get("junction") in ("roundabout", "circular"):
+        return 1
+    return 0
+
+def read_osm_pbf(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Extract the drivable road network from an OSM extract as node coordinates and directed edges
+
+    Returns (lat, lng, tails, heads, dist_m, time_s).
+    """
+    try:
+        import osmium
+    except ImportError as e:
+        raise ImportError("Importing OpenStreetMap extracts requires the 'osmium' package") from e
+
+    class WayHandler(osmium.SimpleHandler):
+        def __init__(self):
+            super().__init__()
+            self.node_index: Dict[int, int] = {}
+            self.lat: List[float] = []
+            self.lng: List[float] = []
+            self.tails: List[int] = []
+            self.heads: List[int] = []
+            self.speeds: List[float] = []
+
+        def way(self, way):
+            highway = way.tags.get("highway")
+            if highway not in HIGHWAY_SPEEDS_KMH:
+                return
+            if way.tags.get("access") in ("no", "private") or way.tags.get("motor_vehicle") in ("no", "private"):
+                return
+
+            direction = _oneway_direction(way.tags, highway)
+            speed = _parse_maxspeed(way.tags.get("maxspeed")) or HIGHWAY_SPEEDS_KMH[highway]
+
+            nodes = []
+            for node in way.nodes:
+                if not node.location.valid():
+                    continue
+                index = self.node_index.get(node.ref)
+                if index is None:
+                    index = len(self.lat)
+                    self.node_index[node.ref] = index
+                    self.lat.append(node.location.lat)
+                    self.lng.append(node.location.lon)
+                nodes.append(index)
+
+            for a, b in zip(nodes, nodes[1:]):
+                if direction >= 0:
+                    self.tails.append(a)
+                    self.heads.append(b)
+                    self.speeds.append(speed)
+                if direction <= 0:
+                    self.tails.append(b)
+                    self.heads.append(a)
+                    self.speeds.append(speed)
+
+    handler = WayHandler()
+    handler.apply_file(path, locations=True)
+
+    lat = np.asarray(handler.lat)
+    lng = np.asarray(handler.lng)
+    tails = np.asarray(handler.tails, dtype=np.int64)
+    heads = np.asarray(handler.heads, dtype=np.int64)
+    dist = _haversine(lat[tails], lng[tails], lat[heads], lng[heads])
+    time = dist / (np.asarray(handler.speeds) / 3.6)
+
+    return lat, lng, tails, heads, dist, time
+
+def collapse_chains(
+    lat: np.ndarray,
+    lng: np.ndarray,
+    tails: np.ndarray,
+    heads: np.ndarray,
+    dist: np.ndarray,
+    time: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Drop the shape-only nodes along ways, keeping intersections and way endpoints
+
+    A node with exactly two neighbours that traffic can only pass straight through
+    (a -> v -> b, plus b -> v -> a on two-way roads) is merged into one edge between
+    its neighbours, summing distance and time along the chain. Shortest paths
+    between the kept nodes are unchanged. Returns arrays in the same form as
+    read_osm_pbf.
+    """
+    n = len(lat)
+    # Parallel edges: only the fastest can be on a shortest path
+    order = np.lexsort((time, heads, tails))
+    tails, heads, dist, time = tails[order], heads[order], dist[order], time[order]
+    first = np.r_[True, (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])] & (tails != heads)
+    tails, heads, dist, time = tails[first], heads[first], dist[first], time[first]
+
+    out_degree = np.bincount(tails, minlength=n)
+    in_degree = np.bincount(heads, minlength=n)
+    pairs = np.unique(np.stack([np.minimum(tails, heads), np.maximum(tails, heads)]), axis=1)
+    neighbours = np.bincount(pairs.ravel(), minlength=n)
+    through = (neighbours == 2) & (in_degree == out_degree) & ((out_degree == 1) | (out_degree == 2))
+
+    indptr, edge_head, edge_dist, edge_time = _to_csr(n, tails, heads, dist, time)
+    indptr, edge_head = indptr.tolist(), edge_head.tolist()
+    edge_dist, edge_time = edge_dist.tolist(), edge_time.tolist()
+    through_list = through.tolist()
+    visited = bytearray(n)
+
+    new_tails: List[int] = []
+    new_heads: List[int] = []
+    new_dist: List[float] = []
+    new_time: List[float] = []
+
+    def walk_from(start: int) -> None:
+        for edge in range(indptr[start], indptr[start + 1]):
+            previous, node = start, edge_head[edge]
+            total_dist, total_time = edge_dist[edge], edge_time[edge]
+            while through_list[node] and node != start:
+                visited[node] = 1
+                for next_edge in range(indptr[node], indptr[node + 1]):
+                    if edge_head[next_edge] != previous:
+                        break
+                previous, node = node, edge_head[next_edge]
+                total_dist += edge_dist[next_edge]
+                total_time += edge_time[next_edge]
+            if node != start:
+                new_tails.append(start)
+                new_heads.append(node)
+                new_dist.append(total_dist)
+                new_time.append(total_time)
+
+    for node in np.flatnonzero(~through).tolist():
+        walk_from(node)
+    # Closed loops with no intersection on them keep one node to anchor the loop
+    for node in range(n):
+        if through_list[node] and not visited[node]:
+            through_list[node] = False
+            visited[node] = 1
+            walk_from(node)
+
+    keep = ~np.asarray(through_list, dtype=bool)
+    remap = np.full(n, -1, dtype=np.int64)
+    remap[keep] = np.arange(int(keep.sum()))
+    return (
+        lat[keep], lng[keep],
+        remap[np.asarray(new_tails, dtype=np.int64)], remap[np.asarray(new_heads, dtype=np.int64)],
+        np.asarray(new_dist, dtype=float), np.asarray(new_time, dtype=float)
+    )
+
+def _to_csr(n: int, tails: np.ndarray, *columns: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Sort edges by tail into CSR form: (indptr, *columns)"""
+    order = np.argsort(tails, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=indptr[1:])
+    return (indptr, *(column[order] for column in columns))
+
+def largest_strongly_connected_component(n: int, tails: np.ndarray, heads: np.ndarray) -> np.ndarray:
+    """Boolean mask of the nodes in the largest strongly connected component (iterative Kosaraju)"""
+    fwd_indptr, fwd_head = _to_csr(n, tails, heads)
+    bwd_indptr, bwd_head = _to_csr(n, heads, tails)
+    fwd_indptr, fwd_head = fwd_indptr.tolist(), fwd_head.tolist()
+    bwd_indptr, bwd_head = bwd_indptr.tolist(), bwd_head.tolist()
+
+    # First pass: finishing order on the forward graph
+    visited = bytearray(n)
+    finished: List[int] = []
+    for root in range(n):
+        if visited[root]:
+            continue
+        visited[root] = 1
+        stack = [(root, fwd_indptr[root])]
+        while stack:
+            node, edge = stack[-1]
+            if edge < fwd_indptr[node + 1]:
+                stack[-1] = (node, edge + 1)
+                head = fwd_head[edge]
+                if not visited[head]:
+                    visited[head] = 1
+                    stack.append((head, fwd_indptr[head]))
+            else:
+                stack.pop()
+                finished.append(node)
+
+    # Second pass: components on the reverse graph in reverse finishing order
+    component = [-1] * n
+    sizes: List[int] = []
+    for root in reversed(finished):
+        if component[root] != -1:
+            continue
+        label = len(sizes)
+        component[root] = label
+        stack = [root]
+        size = 0
+        while stack:
+            node = stack.pop()
+            size += 1
+            for edge in range(bwd_indptr[node], bwd_indptr[node + 1]):
+                head = bwd_head[edge]
+                if component[head] == -1:
+                    component[head] = label
+                    stack.append(head)
+        sizes.append(size)
+
+    if not sizes:
+        return np.zeros(n, dtype=bool)
+    return np.asarray(component) == int(np.argmax(sizes))
+
+def _witness_distances(
+    out_adj: List[Dict[int, Tuple[float, float]]],
+    source: int,
+    excluded: int,
+    targets: set,
+    max_time: float
+) -> Dict[int, float]:
+    """Bounded Dijkstra from source that avoids the node being contracted
+
+    Stops once every target is settled, max_time is exceeded or the settle budget runs out.
+    """
+    settled: Dict[int, float] = {}
+    tentative = {source: 0.0}
+    heap = [(0.0, source)]
+    remaining = len(targets)
+    while heap and len(settled) < WITNESS_SETTLE_LIMIT:
+        time, node = heapq.heappop(heap)
+        if node in settled:
+            continue
+        settled[node] = time
+        if node in targets:
+            remaining -= 1
+            if not remaining:
+                break
+        if time > max_time:
+            break
+        for head, (edge_time, _) in out_adj[node].items():
+            if head == excluded or head in settled:
+                continue
+            candidate = time + edge_time
+            if candidate < tentative.get(head, math.inf):
+                tentative[head] = candidate
+                heapq.heappush(heap, (candidate, head))
+    return settled
+
+def _required_shortcuts(
+    out_adj: List[Dict[int, Tuple[float, float]]],
+    in_adj: List[Dict[int, Tuple[float, float]]],
+    node: int
+) -> List[Tuple[int, int, float, float]]:
+    """Shortcuts (tail, head, time, dist) needed to preserve shortest paths through node"""
+    outgoing = out_adj[node]
+    if not outgoing:
+        return []
+    max_out = max(time for time, _ in outgoing.values())
+
+    shortcuts = []
+    for tail, (in_time, in_dist) in in_adj[node].items():
+        witnesses = _witness_distances(out_adj, tail, node, outgoing.keys() - {tail}, in_time + max_out)
+        for head, (out_time, out_dist) in outgoing.items():
+            if head == tail:
+                continue
+            via_time = in_time + out_time
+            if witnesses.get(head, math.inf) > via_time:
+                shortcuts.append((tail, head, via_time, in_dist + out_dist))
+    return shortcuts
+
+def build_contraction_hierarchy(
+    n: int,
+    tails: np.ndarray,
+    heads: np.ndarray,
+    time: np.ndarray,
+    dist: np.ndarray
+) -> Tuple[Tuple[np.ndarray, ...], Tuple[np.ndarray, ...]]:
+    """Contract nodes by travel time, returning the upward forward and backward CSR graphs
+
+    Each graph is (indptr, head, time, dist). The forward graph holds edges u -> v
+    with rank(v) > rank(u) indexed by u; the backward graph holds edges u -> v with
+    rank(u) > rank(v) indexed by v, pointing at u.
+    """
+    out_adj: List[Dict[int, Tuple[float, float]]] = [{} for _ in range(n)]
+    in_adj: List[Dict[int, Tuple[float, float]]] = [{} for _ in range(n)]
+    for tail, head, edge_time, edge_dist in zip(tails.tolist(), heads.tolist(), time.tolist(), dist.tolist()):
+        if tail == head:
+            continue
+        existing = out_adj[tail].get(head)
+        if existing is None or edge_time < existing[0]:
+            out_adj[tail][head] = (edge_time, edge_dist)
+            in_adj[head][tail] = (edge_time, edge_dist)
+
+    deleted_neighbors = [0] * n
+    level = [0] * n
+
+    def simulate(node: int) -> Tuple[int, List[Tuple[int, int, float, float]]]:
+        """Priority of contracting node next, with the shortcuts that contraction needs
+
+        Edge difference keeps the graph sparse; deleted neighbours and level spread
+        contraction evenly so upward search spaces stay small.
+        """
+        shortcuts = _required_shortcuts(out_adj, in_adj, node)
+        edge_difference = len(shortcuts) - len(out_adj[node]) - len(in_adj[node])
+        return edge_difference + deleted_neighbors[node] + level[node], shortcuts
+
+    heap = [(simulate(node)[0], node) for node in range(n)]
+    heapq.heapify(heap)
+
+    fwd: Tuple[List[int], List[int], List[float], List[float]] = ([], [], [], [])
+    bwd: Tuple[List[int], List[int], List[float], List[float]] = ([], [], [], [])
+    contracted = bytearray(n)
+
+    while heap:
+        _, node = heapq.heappop(heap)
+        if contracted[node]:
+            continue
+
+        # Lazy update: contract only if the node is still the cheapest choice
+        current, shortcuts = simulate(node)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, node))
+            continue
+
+        for head, (edge_time, edge_dist) in out_adj[node].items():
+            fwd[0].append(node)
+            fwd[1].append(head)
+            fwd[2].append(edge_time)
+            fwd[3].append(edge_dist)
+        for tail, (edge_time, edge_dist) in in_adj[node].items():
+            bwd[0].append(node)
+            bwd[1].append(tail)
+            bwd[2].append(edge_time)
+            bwd[3].append(edge_dist)
+
+        for tail, head, via_time, via_dist in shortcuts:
+            existing = out_adj[tail].get(head)
+            if existing is None or via_time < existing[0]:
+                out_adj[tail][head] = (via_time, via_dist)
+                in_adj[head][tail] = (via_time, via_dist)
+
+        neighbors = set(in_adj[node]) | set(out_adj[node])
+        for tail in in_adj[node]:
+            del out_adj[tail][node]
+        for head in out_adj[node]:
+            del in_adj[head][node]
+        for neighbor in neighbors:
+            deleted_neighbors[neighbor] += 1
+            level[neighbor] = max(level[neighbor], level[node] + 1)
+        out_adj[node] = {}
+        in_adj[node] = {}
+        contracted[node] = 1
+
+    def pack(edges) -> Tuple[np.ndarray, ...]:
+        return _to_csr(
+            n,
+            np.asarray(edges[0], dtype=np.int64),
+            np.asarray(edges[1], dtype=np.int32),
+            np.asarray(edges[2], dtype=np.float32),
+            np.asarray(edges[3], dtype=np.float32)
+        )
+
+    return pack(fwd), pack(bwd)
+
+def _grid_keys(lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    row = np.floor(np.asarray(lat) / GRID_CELL_DEG).astype(np.int64)
+    col = np.floor(np.asarray(lng) / GRID_CELL_DEG).astype(np.int64)
+    return row * 100000 + col
+
+def build_road_graph(
+    lat: np.ndarray,
+    lng: np.ndarray,
+    tails: np.ndarray,
+    heads: np.ndarray,
+    dist: np.ndarray,
+    time: np.ndarray,
+    out_dir: str
+) -> None:
+    """Preprocess a directed road network into a memory-mappable graph directory"""
+    lat, lng, tails, heads, dist, time = collapse_chains(lat, lng, tails, heads, dist, time)
+
+    # Keep only the largest strongly connected component so every snapped stop is routable
+    keep = largest_strongly_connected_component(len(lat), tails, heads)
+    remap = np.full(len(lat), -1, dtype=np.int64)
+    remap[keep] = np.arange(int(keep.sum()))
+    edge_mask = keep[tails] & keep[heads]
+    lat, lng = lat[keep], lng[keep]
+    tails, heads = remap[tails[edge_mask]], remap[heads[edge_mask]]
+    dist, time = dist[edge_mask], time[edge_mask]
+    n = len(lat)
+
+    fwd, bwd = build_contraction_hierarchy(n, tails, heads, time, dist)
+
+    keys = _grid_keys(lat, lng)
+    grid_nodes = np.argsort(keys, kind="stable").astype(np.int32)
+
+    arrays = {
+        "lat": lat.astype(np.float64),
+        "lng": lng.astype(np.float64),
+        "fwd_indptr": fwd[0], "fwd_head": fwd[1], "fwd_time": fwd[2], "fwd_dist": fwd[3],
+        "bwd_indptr": bwd[0], "bwd_head": bwd[1], "bwd_time": bwd[2], "bwd_dist": bwd[3],
+        "grid_keys": keys[grid_nodes],
+        "grid_nodes": grid_nodes,
+    }
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in GRAPH_ARRAYS:
+        np.save(os.path.join(out_dir, f"{name}.npy"), arrays[name])
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump({"nodes": n, "edges": int(len(tails)), "upward_edges": int(len(fwd[1]) + len(bwd[1]))}, f)
+
+class RoadGraph:
+    """Contraction-hierarchy road graph backed by memory-mapped CSR arrays"""
+
+    def __init__(self, path: str):
+        self.path = path
+        for name in GRAPH_ARRAYS:
+            # Plain ndarray views keep the mapping but skip np.memmap's per-slice overhead
+            array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            setattr(self, name, array.view(np.ndarray))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lat)
+
+    def _grid_candidates(self, row: int, col: int, radius: int) -> List[np.ndarray]:
+        """Node ids in the square of cells within radius of (row, col)"""
+        candidates = []
+        for r in range(row - radius, row + radius + 1):
+            start = r * 100000 + col - radius
+            lo = np.searchsorted(self.grid_keys, start, side="left")
+            hi = np.searchsorted(self.grid_keys, start + 2 * radius, side="right")
+            if hi > lo:
+                candidates.append(np.asarray(self.grid_nodes[lo:hi]))
+        return candidates
+
+    def nearest_nodes(self, coords: List[Tuple[float, float]]) -> Optional[np.ndarray]:
+        """Snap each (lat, lng) to the closest graph node, searching a widening square of grid cells
+
+        Returns None if any stop has no node within the search (about 64 km): it lies
+        outside the extract and its distances would be meaningless.
+        """
+        nodes = np.empty(len(coords), dtype=np.int64)
+        for k, (lat, lng) in enumerate(coords):
+            row = math.floor(lat / GRID_CELL_DEG)
+            col = math.floor(lng / GRID_CELL_DEG)
+            radius = 1
+            candidates = self._grid_candidates(row, col, radius)
+            while not candidates and radius < 64:
+                radius *= 2
+                candidates = self._grid_candidates(row, col, radius)
+            if not candidates:
+                return None
+            # A node just outside the square can be closer than one in its corner
+            candidates = self._grid_candidates(row, col, radius + 1)
+
+            candidate_nodes = np.concatenate(candidates)
+            distances = _haversine(lat, lng, self.lat[candidate_nodes], self.lng[candidate_nodes])
+            nodes[k] = candidate_nodes[int(np.argmin(distances))]
+        return nodes
+
+    def _upward_search(self, source: int, forward: bool) -> Tuple[List[int], List[float], List[float]]:
+        """Dijkstra over one upward graph with stall-on-demand
+
+        Returns the nodes that can lie on a shortest path with their (time, dist) from source.
+        """
+        if forward:
+            graph = (self.fwd_indptr, self.fwd_head, self.fwd_time, self.fwd_dist)
+            stall_graph = (self.bwd_indptr, self.bwd_head, self.bwd_time)
+        else:
+            graph = (self.bwd_indptr, self.bwd_head, self.bwd_time, self.bwd_dist)
+            stall_graph = (self.fwd_indptr, self.fwd_head, self.fwd_time)
+        indptr, head, time, dist = graph
+        stall_indptr, stall_head, stall_time = stall_graph
+
+        nodes: List[int] = []
+        times: List[float] = []
+        dists: List[float] = []
+        settled = set()
+        tentative = {source: 0.0}
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            node_time, node_dist, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+
+            # A higher node that already reaches this one more cheaply proves it is
+            # not on any shortest up-path, so its edges need not be relaxed
+            start, end = stall_indptr[node], stall_indptr[node + 1]
+            if start != end and any(
+                tentative.get(higher, math.inf) + edge_time < node_time
+                for higher, edge_time in zip(stall_head[start:end].tolist(), stall_time[start:end].tolist())
+            ):
+                continue
+
+            nodes.append(node)
+            times.append(node_time)
+            dists.append(node_dist)
+
+            start, end = indptr[node], indptr[node + 1]
+            if start == end:
+                continue
+            for next_node, edge_time, edge_dist in zip(
+                head[start:end].tolist(), time[start:end].tolist(), dist[start:end].tolist()
+            ):
+                next_time = node_time + edge_time
+                if next_time < tentative.get(next_node, math.inf):
+                    tentative[next_node] = next_time
+                    heapq.heappush(heap, (next_time, node_dist + edge_dist, next_node))
+        return nodes, times, dists
+
+    def many_to_many(self, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fastest-route (distance_m, duration_s) matrices between graph nodes, via bucket-based CH queries"""
+        # Backward searches from every target fill per-node buckets of (target, time, dist)
+        bucket_node, bucket_target, bucket_time, bucket_dist = [], [], [], []
+        for j, target in enumerate(np.asarray(targets).tolist()):
+            nodes, times, dists = self._upward_search(target, forward=False)
+            bucket_node.extend(nodes)
+            bucket_target.extend([j] * len(nodes))
+            bucket_time.extend(times)
+            bucket_dist.extend(dists)
+
+        order = np.argsort(np.asarray(bucket_node, dtype=np.int64), kind="stable")
+        bucket_node = np.asarray(bucket_node, dtype=np.int64)[order]
+        bucket_target = np.asarray(bucket_target, dtype=np.int64)[order]
+        bucket_time = np.asarray(bucket_time)[order]
+        bucket_dist = np.asarray(bucket_dist)[order]
+        bucket_nodes, bucket_start, bucket_size = np.unique(bucket_node, return_index=True, return_counts=True)
+
+        durations = np.full((len(sources), len(targets)), np.inf)
+        distances = np.full((len(sources), len(targets)), np.inf)
+        for i, source in enumerate(np.asarray(sources).tolist()):
+            nodes, times, dists = self._upward_search(source, forward=True)
+
+            # Meeting nodes are the ones settled forward that also hold bucket entries
+            position = np.searchsorted(bucket_nodes, nodes)
+            position[position == len(bucket_nodes)] = 0
+            meets = bucket_nodes[position] == np.asarray(nodes)
+            if not meets.any():
+                continue
+            starts = bucket_start[position[meets]]
+            sizes = bucket_size[position[meets]]
+
+            # Expand every meeting node into its bucket entries
+            offsets = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(int(sizes.sum()))
+            total_time = np.repeat(np.asarray(times)[meets], sizes) + bucket_time[offsets]
+            total_dist = np.repeat(np.asarray(dists)[meets], sizes) + bucket_dist[offsets]
+            columns = bucket_target[offsets]
+
+            # Keep the fastest meeting per target
+            best = np.lexsort((total_time, columns))
+            columns = columns[best]
+            first = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+            durations[i, columns[first]] = total_time[best][first]
+            distances[i, columns[first]] = total_dist[best][first]
+
+        return distances, durations
+
+    def distance_matrix(self, coords: List[Tuple[float, float]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """n x n (distance_m, duration_s) matrices between coordinates, or None if a
+        stop lies outside the graph
+        """
+        nodes = self.nearest_nodes(coords)
+        if nodes is None:
+            return None
+        distances, durations = self.many_to_many(nodes, nodes)
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(durations, 0.0)
+        return distances, durations
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a local routing graph from an OpenStreetMap PBF extract")
+    parser.add_argument("pbf", help="Path to the .osm.pbf extract")
+    parser.add_argument("out_dir", help="Directory to write the graph arrays to")
+    args = parser.parse_args()
+
+    lat, lng, tails, heads, dist, time = read_osm_pbf(args.pbf)
+    print(f"Read {len(lat)} nodes and {len(tails)} directed edges")
+    build_road_graph(lat, lng, tails, heads, dist, time, args.out_dir)
+    with open(os.path.join(args.out_dir, "meta.json")) as f:
+        print(f"Graph written to {args.out_dir}: {json.load(f)}")
+
+if __name__ == "__main__":
+    main()
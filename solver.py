@@ -0,0 +1,874 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Cost used in place of unroutable (infinite) legs so move deltas stay finite
+UNREACHABLE_COST = 1e9
+
+def calculate_angle(p1: Tuple[float, float], p2: Tuple[float, float], p3: Tuple[float, float]) -> float:
+    """Calculate angle between three points"""
+    def to_vec(a, b):
+        return (b[0] - a[0], b[1] - a[1])
+    
+    v1 = to_vec(p2, p1)
+    v2 = to_vec(p2, p3)
+    angle1 = math.atan2(v1[1], v1[0])
+    angle2 = math.atan2(v2[1], v2[0])
+    angle = math.degrees(angle2 - angle1)
+    
+    # Normalize angle to [-180, 180]
+    while angle <= -180:
+        angle += 360
+    while angle > 180:
+        angle -= 360
+    
+    return angle
+
+# Turn classes for a driver arriving at the middle stop of prev -> current -> next
+TURN_STRAIGHT = 0
+TURN_LEFT = 1
+TURN_RIGHT = 2
+TURN_U = 3
+
+# Angles this close to a turn-class boundary are recomputed with calculate_angle so the
+# table never disagrees with the scalar computation by a rounding error
+_ANGLE_BOUNDARY_TOLERANCE = 1e-9
+
+# Largest stop count whose n x n bearing table is kept (2000 stops = 32 MB);
+# above it bearings are computed per row as needed
+BEARING_TABLE_MAX_STOPS = 2000
+
+# Largest stop count for which the int8 class block through each stop is cached (n^3 bytes)
+TURN_CLASS_BLOCK_MAX_STOPS = 256
+
+# Turn tables kept per process, keyed by coordinate set
+TURN_TABLE_CACHE_SIZE = 4
+
+def classify_angle(angle: float) -> int:
+    """Turn class of an angle returned by calculate_angle"""
+    if -135 < angle < -45:
+        return TURN_RIGHT
+    if 45 < angle < 135:
+        return TURN_LEFT
+    if abs(angle) >= 135:
+        return TURN_STRAIGHT
+    return TURN_U
+
+def _normalize_angles(angles: np.ndarray) -> np.ndarray:
+    # Normalize angle to [-180, 180]
+    angles = np.where(angles <= -180, angles + 360, angles)
+    return np.where(angles > 180, angles - 360, angles)
+
+# Turn class of each whole-degree bucket [k, k + 1) of a normalized angle, indexed by k + 180.
+# Bucket edges coincide with the class boundaries; angles on an edge are borderline and
+# re-classified exactly
+_TURN_CLASS_BY_DEGREE = np.array([classify_angle(k + 0.5) for k in range(-180, 181)], dtype=np.int8)
+
+def _classify_angles(angles: np.ndarray) -> np.ndarray:
+    return _TURN_CLASS_BY_DEGREE[(angles + 180).astype(np.intp)]
+
+def _borderline(angles: np.ndarray) -> np.ndarray:
+    return np.abs(np.abs(np.abs(angles) - 90) - 45) < _ANGLE_BOUNDARY_TOLERANCE
+
+class TurnTable:
+    """Bearings between every pair of stops and turn classes derived from them
+    
+    calculate_angle(p1, p2, p3) is the bearing from p2 to p3 minus the bearing from
+    p2 to p1, so with an n x n bearing table a turn costs a subtraction instead of
+    two atan2 calls. For small inputs the classes of every turn through a stop are
+    also kept as an n x n int8 block, built on first use.
+    """
+    
+    def __init__(self, coords: List[Tuple[float, float]]):
+        self.coords = coords
+        self.points = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.n = len(self.points)
+        self.bearings = self._bearing_rows(np.arange(self.n)) if self.n <= BEARING_TABLE_MAX_STOPS else None
+        self._rows: Dict[int, List[float]] = {}
+        self._blocks: Dict[int, np.ndarray] = {}
+    
+    def _bearing_rows(self, stops: np.ndarray) -> np.ndarray:
+        delta = self.points[None, :, :] - self.points[stops][:, None, :]
+        return np.arctan2(delta[..., 1], delta[..., 0])
+    
+    def bearings_from(self, stop: int) -> np.ndarray:
+        """Bearing in radians from stop to every stop"""
+        if self.bearings is not None:
+            return self.bearings[stop]
+        return self._bearing_rows(np.array([stop]))[0]
+    
+    def _fix_borderline(self, classes: np.ndarray, angles: np.ndarray, prevs, current: int, nexts) -> np.ndarray:
+        """Re-classify angles near a class boundary with calculate_angle"""
+        for index in zip(*np.nonzero(_borderline(angles))):
+            prev = prevs[index[0]] if classes.ndim == 2 else prevs
+            nxt = nexts[index[-1]]
+            classes[index] = classify_angle(calculate_angle(self.coords[prev], self.coords[current], self.coords[nxt]))
+        return classes
+    
+    def classify_many(self, prev: int, current: int, nexts: np.ndarray) -> np.ndarray:
+        """Turn classes of prev -> current -> each of nexts"""
+        if current in self._blocks:
+            return self._blocks[current][prev, nexts]
+        if self.bearings is not None:
+            outgoing, incoming = self.bearings[current, nexts], self.bearings[current, prev]
+        else:
+            delta = self.points[nexts] - self.points[current]
+            outgoing = np.arctan2(delta[:, 1], delta[:, 0])
+            incoming = math.atan2(self.points[prev, 1] - self.points[current, 1], self.points[prev, 0] - self.points[current, 0])
+        angles = _normalize_angles(np.degrees(outgoing - incoming))
+        return self._fix_borderline(_classify_angles(angles), angles, prev, current, nexts)
+    
+    def classes_at(self, current: int) -> np.ndarray:
+        """n x n int8 block of turn classes through current, indexed [prev, next]"""
+        block = self._blocks.get(current)
+        if block is None:
+            row = self.bearings_from(current)
+            angles = _normalize_angles(np.degrees(row[None, :] - row[:, None]))
+            stops = np.arange(self.n)
+            block = self._fix_borderline(_classify_angles(angles), angles, stops, current, stops)
+            if self.n <= TURN_CLASS_BLOCK_MAX_STOPS:
+                self._blocks[current] = block
+        return block
+    
+    def turn(self, prev: int, current: int, nxt: int) -> int:
+        """Turn class of prev -> current -> nxt"""
+        if self.n <= TURN_CLASS_BLOCK_MAX_STOPS:
+            return int(self.classes_at(current)[prev, nxt])
+        row = self._rows.get(current)
+        if row is None:
+            if self.bearings is None:
+                return classify_angle(calculate_angle(self.coords[prev], self.coords[current], self.coords[nxt]))
+            row = self._rows[current] = self.bearings[current].tolist()
+        angle = math.degrees(row[nxt] - row[prev])
+        if angle <= -180:
+            angle += 360
+        elif angle > 180:
+            angle -= 360
+        if abs(abs(abs(angle) - 90) - 45) < _ANGLE_BOUNDARY_TOLERANCE:
+            angle = calculate_angle(self.coords[prev], self.coords[current], self.coords[nxt])
+        return classify_angle(angle)
+    
+    def route_turns(self, order: List[int]) -> np.ndarray:
+        """Turn class at every interior stop of an open route"""
+        order = np.asarray(order, dtype=int)
+        if len(order) < 3:
+            return np.zeros(0, dtype=np.int8)
+        prevs, currents, nexts = order[:-2], order[1:-1], order[2:]
+        if self.bearings is not None:
+            outgoing = self.bearings[currents, nexts]
+            incoming = self.bearings[currents, prevs]
+        else:
+            points = self.points
+            outgoing = np.arctan2(points[nexts, 1] - points[currents, 1], points[nexts, 0] - points[currents, 0])
+            incoming = np.arctan2(points[prevs, 1] - points[currents, 1], points[prevs, 0] - points[currents, 0])
+        angles = _normalize_angles(np.degrees(outgoing - incoming))
+        classes = _classify_angles(angles)
+        for k in np.flatnonzero(_borderline(angles)):
+            angle = calculate_angle(self.coords[prevs[k]], self.coords[currents[k]], self.coords[nexts[k]])
+            classes[k] = classify_angle(angle)
+        return classes
+
+_turn_tables: "OrderedDict[Tuple[Tuple[float, float], ...], TurnTable]" = OrderedDict()
+
+def get_turn_table(coords: List[Tuple[float, float]]) -> TurnTable:
+    """Shared turn table for a coordinate set, so repeated solves over the same stops reuse it"""
+    key = tuple((float(lat), float(lng)) for lat, lng in coords)
+    table = _turn_tables.get(key)
+    if table is None:
+        table = _turn_tables[key] = TurnTable(coords)
+        if len(_turn_tables) > TURN_TABLE_CACHE_SIZE:
+            _turn_tables.popitem(last=False)
+    else:
+        _turn_tables.move_to_end(key)
+    return table
+
+def solve_tsp_nearest_neighbor_with_right_turn_penalty(
+    coords: List[Tuple[float, float]], 
+    matrix: np.ndarray, 
+    right_turn_penalty: float = 500,
+    turns: Optional[TurnTable] = None,
+    noise: float = 0.0,
+    seed: int = 0
+) -> List[int]:
+    """Solve TSP using nearest neighbor with right turn penalty
+    
+    Every step prices all unvisited stops in one array operation. Ties go to the
+    lowest index, as in a scan over the stops in index order. A positive noise
+    scales each candidate's cost by a random factor in [1, 1 + noise), giving a
+    different, still greedy, route for each seed.
+    """
+    matrix = np.asarray(matrix, dtype=float)
+    n = len(matrix)
+    turns = turns or get_turn_table(coords)
+    unvisited = np.ones(n, dtype=bool)
+    unvisited[0] = False
+    order = [0]
+    current = 0
+    prev = None
+    rng = np.random.default_rng(seed) if noise > 0 else None
+    
+    for _ in range(n - 1):
+        candidates = np.flatnonzero(unvisited)
+        cost = matrix[current, candidates]
+        
+        # If this is not the first move, penalise right turns
+        if prev is not None:
+            right = turns.classify_many(prev, current, candidates) == TURN_RIGHT
+            cost = cost + np.where(right, right_turn_penalty, 0.0)
+        
+        if rng is not None:
+            cost = cost * (1 + noise * rng.random(len(candidates)))
+        
+        next_city = int(candidates[np.argmin(cost)])
+        order.append(next_city)
+        unvisited[next_city] = False
+        prev = current
+        current = next_city
+    
+    return order
+
+# Grid resolution of the Hilbert curve: 2^16 cells per side is ~0.3 m across a city
+HILBERT_ORDER = 16
+
+def _hilbert_index(x: np.ndarray, y: np.ndarray, order: int) -> np.ndarray:
+    """Distance along a Hilbert curve over a 2^order grid, for integer cell coordinates"""
+    x = x.astype(np.int64)
+    y = y.astype(np.int64)
+    index = np.zeros_like(x)
+    side = 1 << order
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        index += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the sub-curve has the canonical orientation
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s >>= 1
+    return index
+
+def solve_hilbert(coords: List[Tuple[float, float]], order: int = HILBERT_ORDER) -> List[int]:
+    """Route from stop 0 following a Hilbert curve over the stops' coordinates
+    
+    Needs no distance matrix and runs in O(n log n), as an initial route or as the
+    answer for manifests too large for anything else. The curve is a line, so from
+    stop 0 the route follows it to one end and then jumps back next to stop 0 to
+    cover the other side; the direction with the shorter jump is used.
+    """
+    n = len(coords)
+    if n <= 2:
+        return list(range(n))
+    
+    points = np.asarray(coords, dtype=float).reshape(n, 2)
+    points = points * np.array([1.0, math.cos(math.radians(float(points[:, 0].mean())))])
+    low = points.min(axis=0)
+    span = max(float((points.max(axis=0) - low).max()), 1e-12)
+    cells = np.minimum(((points - low) / span * (1 << order)).astype(np.int64), (1 << order) - 1)
+    sequence = np.argsort(_hilbert_index(cells[:, 1], cells[:, 0], order), kind="stable").tolist()
+    
+    position = sequence.index(0)
+    if position == 0:
+        return sequence
+    if position == n - 1:
+        return sequence[::-1]
+    
+    def gap(a: int, b: int) -> float:
+        return float(np.hypot(*(points[a] - points[b])))
+    
+    # Forward to the curve's end, then back from just before stop 0 to its start;
+    # or backward to the curve's start, then forward from just after stop 0
+    forward = sequence[position:] + sequence[:position][::-1]
+    backward = sequence[:position + 1][::-1] + sequence[position + 1:]
+    if gap(sequence[-1], sequence[position - 1]) <= gap(sequence[0], sequence[position + 1]):
+        return forward
+    return backward
+
+def route_cost(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    order: List[int],
+    right_turn_penalty: float = 500,
+    turns: Optional[TurnTable] = None
+) -> float:
+    """Total distance of an open route plus the penalty for every right turn along it"""
+    cost = sum(matrix[order[i]][order[i + 1]] for i in range(len(order) - 1))
+    return cost + right_turn_penalty * count_right_turns(coords, order, turns)
+
+def count_right_turns(
+    coords: List[Tuple[float, float]],
+    order: List[int],
+    turns: Optional[TurnTable] = None
+) -> int:
+    """Number of right turns taken along an open route"""
+    turns = turns or get_turn_table(coords)
+    return int(np.count_nonzero(turns.route_turns(order) == TURN_RIGHT))
+
+class _RouteEvaluator:
+    """O(1) cost of a route rebuilt from reversed or reordered segments of the current route
+
+    A candidate route is described as pieces (a, b, reversed) of positions in the
+    current order. Prefix sums over forward and reverse leg costs, and over right and
+    left turns, price each piece's interior in constant time, so only the legs and
+    turns at the joins between pieces are evaluated explicitly. A segment driven
+    backwards turns left wherever it used to turn right, and vice versa.
+    """
+    
+    def __init__(
+        self,
+        coords: List[Tuple[float, float]],
+        matrix: np.ndarray,
+        order: List[int],
+        right_turn_penalty: float,
+        turns: TurnTable
+    ):
+        self.turns = turns
+        self.matrix = np.where(np.isfinite(matrix), matrix, UNREACHABLE_COST).tolist()
+        self.penalty = right_turn_penalty
+        self.reset(order)
+    
+    def reset(self, order: List[int]) -> None:
+        """Rebuild the prefix sums after the route has changed"""
+        self.order = list(order)
+        n = len(order)
+        self.position = [0] * n
+        for k, stop in enumerate(order):
+            self.position[stop] = k
+        fwd = [0.0] * n
+        rev = [0.0] * n
+        rights = [0] * (n + 1)
+        lefts = [0] * (n + 1)
+        for k in range(1, n):
+            a, b = order[k - 1], order[k]
+            fwd[k] = fwd[k - 1] + self.matrix[a][b]
+            rev[k] = rev[k - 1] + self.matrix[b][a]
+        classes = [TURN_STRAIGHT, *self.turns.route_turns(order).tolist(), TURN_STRAIGHT]
+        for k in range(n):
+            rights[k + 1] = rights[k] + (classes[k] == TURN_RIGHT)
+            lefts[k + 1] = lefts[k] + (classes[k] == TURN_LEFT)
+        self.fwd, self.rev, self.rights, self.lefts = fwd, rev, rights, lefts
+        self.cost = fwd[-1] + self.penalty * rights[-1] if n else 0.0
+    
+    def _right(self, a: int, b: int, c: int) -> bool:
+        return self.turns.turn(a, b, c) == TURN_RIGHT
+    
+    def pieces_cost(self, pieces: List[Tuple[int, int, bool]]) -> float:
+        """Cost of the route formed by concatenating the given pieces of the current order"""
+        order = self.order
+        total = 0.0
+        turns = 0
+        ends = []
+        for a, b, reverse in pieces:
+            if reverse:
+                total += self.rev[b] - self.rev[a]
+                if b - a > 1:
+                    turns += self.lefts[b] - self.lefts[a + 1]
+                ends.append((order[b], order[b - 1] if b > a else None, order[a + 1] if b > a else None, order[a]))
+            else:
+                total += self.fwd[b] - self.fwd[a]
+                if b - a > 1:
+                    turns += self.rights[b] - self.rights[a + 1]
+                ends.append((order[a], order[a + 1] if b > a else None, order[b - 1] if b > a else None, order[b]))
+        
+        last = len(ends) - 1
+        for k, (first, second, second_last, final) in enumerate(ends):
+            before = ends[k - 1][3] if k > 0 else None
+            after = ends[k + 1][0] if k < last else None
+            if after is not None:
+                total += self.matrix[final][after]
+            if second is None:
+                # Single-node piece: one turn, between its neighbouring pieces
+                if before is not None and after is not None and self._right(before, first, after):
+                    turns += 1
+                continue
+            if before is not None and self._right(before, first, second):
+                turns += 1
+            if after is not None and self._right(second_last, final, after):
+                turns += 1
+        
+        return total + turns * self.penalty
+
+def _two_opt_pieces(n: int, i: int, j: int) -> List[Tuple[int, int, bool]]:
+    """Reverse positions i..j"""
+    pieces = [(0, i - 1, False), (i, j, True)]
+    if j < n - 1:
+        pieces.append((j + 1, n - 1, False))
+    return pieces
+
+def _or_opt_pieces(n: int, i: int, length: int, k: int, reverse: bool) -> List[Tuple[int, int, bool]]:
+    """Move positions i..i+length-1 to just after position k, optionally reversed"""
+    end = i + length - 1
+    segment = (i, end, reverse)
+    if k < i:
+        pieces = [(0, k, False), segment, (k + 1, i - 1, False)]
+        if end < n - 1:
+            pieces.append((end + 1, n - 1, False))
+    else:
+        pieces = [(0, i - 1, False), (end + 1, k, False), segment]
+        if k < n - 1:
+            pieces.append((k + 1, n - 1, False))
+    return pieces
+
+def _apply_pieces(order: List[int], pieces: List[Tuple[int, int, bool]]) -> List[int]:
+    route = []
+    for a, b, reverse in pieces:
+        segment = order[a:b + 1]
+        route.extend(reversed(segment) if reverse else segment)
+    return route
+
+# Below this many stops local search always tries the full neighbourhood
+CANDIDATE_LISTS_MIN_STOPS = 50
+
+def candidate_lists(matrix: np.ndarray, k: int) -> np.ndarray:
+    """The k cheapest other stops for every stop, cheapest first, by the cheaper
+    direction of travel between the two
+    """
+    cost = np.where(np.isfinite(matrix), matrix, UNREACHABLE_COST)
+    cost = np.minimum(cost, cost.T)
+    np.fill_diagonal(cost, np.inf)
+    k = max(1, min(k, len(cost) - 1))
+    nearest = np.argpartition(cost, k - 1, axis=1)[:, :k]
+    ranked = np.take_along_axis(cost, nearest, axis=1).argsort(axis=1, kind="stable")
+    return np.take_along_axis(nearest, ranked, axis=1)
+
+def improve_route(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    order: List[int],
+    right_turn_penalty: float = 500,
+    time_limit_ms: Optional[float] = None,
+    max_segment_length: int = 3,
+    turns: Optional[TurnTable] = None,
+    neighbours: Optional[np.ndarray] = None
+) -> List[int]:
+    """Improve an open route with 2-opt and Or-opt moves until a local optimum or the time limit
+
+    The first stop stays fixed. Moves are scored on the asymmetric matrix plus the
+    right-turn penalty at every junction they change. With neighbours (see
+    candidate_lists) only moves that create a leg to a candidate neighbour are tried.
+    """
+    if len(order) < 4:
+        return list(order)
+    
+    deadline = time.perf_counter() + time_limit_ms / 1000 if time_limit_ms is not None else None
+    evaluator = _RouteEvaluator(coords, matrix, order, right_turn_penalty, turns or get_turn_table(coords))
+    _local_search(evaluator, deadline, max_segment_length, neighbours)
+    return evaluator.order
+
+def _dense_moves(n: int, i: int, max_segment_length: int):
+    """Every 2-opt reversal starting at position i and every Or-opt move of a segment starting at i"""
+    for j in range(i + 1, n):
+        yield _two_opt_pieces(n, i, j)
+    for length in range(1, min(max_segment_length, n - i) + 1):
+        for k in range(0, n):
+            if i - 1 <= k <= i + length - 1:
+                continue
+            yield _or_opt_pieces(n, i, length, k, False)
+            if length > 1:
+                yield _or_opt_pieces(n, i, length, k, True)
+
+def _candidate_moves(evaluator: _RouteEvaluator, i: int, max_segment_length: int, neighbours: List[List[int]]):
+    """Moves anchored at position i whose new legs reach a candidate neighbour"""
+    order = evaluator.order
+    position = evaluator.position
+    n = len(order)
+    
+    # 2-opt reversing i..j creates order[i-1] -> order[j] and order[i] -> order[j+1]
+    for c in neighbours[order[i - 1]]:
+        j = position[c]
+        if j > i:
+            yield _two_opt_pieces(n, i, j)
+    for c in neighbours[order[i]]:
+        j = position[c] - 1
+        if j > i:
+            yield _two_opt_pieces(n, i, j)
+    
+    # Or-opt: put the segment next to a neighbour of either of its ends
+    for length in range(1, min(max_segment_length, n - i) + 1):
+        end = i + length - 1
+        near = set(neighbours[order[i]])
+        near.update(neighbours[order[end]])
+        for c in near:
+            p = position[c]
+            for k in (p - 1, p):
+                if k < 0 or i - 1 <= k <= end:
+                    continue
+                yield _or_opt_pieces(n, i, length, k, False)
+                if length > 1:
+                    yield _or_opt_pieces(n, i, length, k, True)
+
+def _local_search(
+    evaluator: _RouteEvaluator,
+    deadline: Optional[float],
+    max_segment_length: int = 3,
+    neighbours: Optional[np.ndarray] = None
+) -> None:
+    """First-improvement 2-opt/Or-opt on the evaluator's route, in place
+    
+    Positions are visited in turn as move anchors; the search stops once every
+    anchor in a row has no improving move.
+    """
+    n = len(evaluator.order)
+    candidates = neighbours.tolist() if neighbours is not None else None
+    count = 0
+    anchor = 1
+    unimproved = 0
+    while unimproved < n - 1:
+        if candidates is None:
+            moves = _dense_moves(n, anchor, max_segment_length)
+        else:
+            moves = _candidate_moves(evaluator, anchor, max_segment_length, candidates)
+        for pieces in moves:
+            count += 1
+            if deadline is not None and count % 256 == 0 and time.perf_counter() > deadline:
+                return
+            if evaluator.pieces_cost(pieces) < evaluator.cost - 1e-6:
+                evaluator.reset(_apply_pieces(evaluator.order, pieces))
+                unimproved = 0
+                break
+        else:
+            unimproved += 1
+            anchor = anchor % (n - 1) + 1
+
+def _double_bridge(order: List[int], rng: random.Random) -> List[int]:
+    """Random double-bridge kick on an open route: A B C D -> A C B D, keeping the first stop"""
+    i, j, k = sorted(rng.sample(range(1, len(order)), 3))
+    return order[:i] + order[j:k] + order[i:j] + order[k:]
+
+def iterated_local_search(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    order: List[int],
+    right_turn_penalty: float = 500,
+    time_limit_ms: float = 1000,
+    seed: int = 0,
+    turns: Optional[TurnTable] = None,
+    neighbours: Optional[np.ndarray] = None
+) -> List[int]:
+    """Anytime improvement: local search, then double-bridge kicks each followed by local
+    search, until the time limit; returns the best route found
+    
+    A kicked route replaces the current one when it is no worse, so the search can
+    drift across plateaus. The same seed and budget give the same sequence of kicks.
+    """
+    deadline = time.perf_counter() + time_limit_ms / 1000
+    evaluator = _RouteEvaluator(coords, matrix, order, right_turn_penalty, turns or get_turn_table(coords))
+    if len(order) < 4:
+        return list(order)
+    
+    _local_search(evaluator, deadline, neighbours=neighbours)
+    current, current_cost = evaluator.order, evaluator.cost
+    best, best_cost = current, current_cost
+    if len(order) < 5:
+        return best
+    
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        evaluator.reset(_double_bridge(current, rng))
+        _local_search(evaluator, deadline, neighbours=neighbours)
+        if evaluator.cost <= current_cost:
+            current, current_cost = evaluator.order, evaluator.cost
+            if current_cost < best_cost - 1e-6:
+                best, best_cost = current, current_cost
+    
+    return best
+
+# Memory allowed for the exact solver's DP tables, including per-layer scratch space
+EXACT_MAX_BYTES = 256 * 1024 * 1024
+
+# Scratch space for one chunk of a DP layer; larger layers are processed in chunks
+_EXACT_CHUNK_BYTES = 32 * 1024 * 1024
+
+# Rough exact-solver cost per unit of 2^(n-1) * n^3 work, measured at 10 to 16 stops;
+# on the fast side, so only solves that clearly cannot finish are skipped
+_EXACT_NS_PER_UNIT = 10
+
+# Share of an anytime budget the exact solver may use; local search gets the rest
+EXACT_BUDGET_SHARE = 0.5
+
+def exact_memory_bytes(n: int) -> int:
+    """DP table size of the exact solver for n stops: float32 costs plus int8 parents"""
+    return (1 << max(n - 1, 0)) * n * n * 5 + _EXACT_CHUNK_BYTES
+
+def exact_time_estimate_ms(n: int) -> float:
+    """Approximate run time of the exact solver for n stops"""
+    return (1 << max(n - 1, 0)) * n ** 3 * _EXACT_NS_PER_UNIT / 1e6
+
+def solve_exact_with_right_turn_penalty(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    right_turn_penalty: float = 500,
+    time_limit_ms: Optional[float] = None,
+    max_bytes: int = EXACT_MAX_BYTES,
+    turns: Optional[TurnTable] = None,
+    end: Optional[int] = None
+) -> Optional[List[int]]:
+    """Optimal open route from stop 0 by Held-Karp dynamic programming
+    
+    The DP state is (visited set, last stop, previous stop), so the right-turn
+    penalty at every stop is modelled exactly. Tables are float32 costs with int8
+    back-pointers, filled one subset size at a time. With end given the route must
+    finish at that stop. Returns None when the tables would exceed max_bytes or the
+    time limit runs out.
+    """
+    n = len(matrix)
+    if n <= 2:
+        return list(range(n))
+    if n > 127 or exact_memory_bytes(n) > max_bytes:
+        return None
+    
+    deadline = time.perf_counter() + time_limit_ms / 1000 if time_limit_ms else None
+    turns = turns or get_turn_table(coords)
+    legs = np.where(np.isfinite(matrix), matrix, UNREACHABLE_COST).astype(np.float32)
+    
+    # penalty[last, prev, next]: cost of the turn at last when arriving from prev
+    penalty = np.stack([turns.classes_at(last) == TURN_RIGHT for last in range(n)]).astype(np.float32)
+    penalty *= right_turn_penalty
+    
+    # Subsets cover stops 1..n-1; bit k stands for stop k + 1
+    m = n - 1
+    size = 1 << m
+    cost = np.full((size, n, n), np.inf, dtype=np.float32)
+    parent = np.zeros((size, n, n), dtype=np.int8)
+    for stop in range(1, n):
+        cost[1 << (stop - 1), stop, 0] = legs[0, stop]
+    
+    masks = np.arange(size)
+    popcount = np.zeros(size, dtype=np.int64)
+    for bit in range(m):
+        popcount += (masks >> bit) & 1
+    bits = 1 << (np.arange(n) - 1).clip(min=0)
+    chunk = max(1, _EXACT_CHUNK_BYTES // (n * n * n * 4))
+    
+    for layer in range(1, m):
+        layer_masks = masks[popcount == layer]
+        for start in range(0, len(layer_masks), chunk):
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            batch = layer_masks[start:start + chunk]
+            # extended[b, last, prev, next] -> best over prev for each (last, next)
+            extended = cost[batch][:, :, :, None] + penalty[None]
+            best_prev = extended.argmin(axis=2)
+            best = np.take_along_axis(extended, best_prev[:, :, None, :], axis=2)[:, :, 0, :] + legs[None]
+            for nxt in range(1, n):
+                open_masks = (batch & bits[nxt]) == 0
+                if not open_masks.any():
+                    continue
+                targets = batch[open_masks] | bits[nxt]
+                candidate = best[open_masks, :, nxt]
+                current = cost[targets, nxt, :]
+                better = candidate < current
+                cost[targets, nxt, :] = np.where(better, candidate, current)
+                parent[targets, nxt, :] = np.where(better, best_prev[open_masks, :, nxt], parent[targets, nxt, :])
+    
+    full = size - 1
+    if end is None:
+        last, prev = np.unravel_index(np.argmin(cost[full]), (n, n))
+    else:
+        last, prev = end, int(np.argmin(cost[full, end]))
+    if not np.isfinite(cost[full, last, prev]):
+        return None
+    
+    route = []
+    mask = full
+    while True:
+        route.append(int(last))
+        if mask == bits[last]:
+            break
+        before = parent[mask, last, prev]
+        mask ^= bits[last]
+        last, prev = prev, before
+    route.append(0)
+    return route[::-1]
+
+def window_ranges(length: int, positions: List[int], window: int) -> List[Tuple[int, int]]:
+    """Disjoint route position ranges [lo, hi) reaching window stops either side of each
+    of the sorted positions; the stops just outside each range stay fixed, and the
+    first stop never moves
+    """
+    ranges = []
+    previous_hi = 0
+    for position in positions:
+        lo = max(position - window, previous_hi + 1, 1)
+        hi = min(position + window, length)
+        if hi - lo >= 2:
+            ranges.append((lo, hi))
+            previous_hi = hi
+    return ranges
+
+def resequence_window(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    right_turn_penalty: float,
+    has_end: bool
+) -> Optional[List[int]]:
+    """Best order of a window's stops between its fixed first stop (index 0) and, when
+    has_end, its fixed last stop (the final index)
+    """
+    end = len(coords) - 1 if has_end else None
+    return solve_exact_with_right_turn_penalty(coords, matrix, right_turn_penalty, end=end)
+
+def insert_stops(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    order: List[int],
+    stops: List[int],
+    right_turn_penalty: float = 500
+) -> List[int]:
+    """Add stops to a route one at a time, each where it adds the least distance plus
+    right-turn penalty; the first stop stays first
+    
+    Reads only the legs of the route and the rows and columns of the new stops, so
+    the rest of matrix may be unknown.
+    """
+    turns = get_turn_table(coords)
+    route = list(order)
+    
+    def right(a: Optional[int], b: int, c: Optional[int]) -> int:
+        if a is None or c is None:
+            return 0
+        return int(turns.turn(a, b, c) == TURN_RIGHT)
+    
+    for stop in stops:
+        best_cost, best_position = math.inf, len(route)
+        for p in range(len(route)):
+            before = route[p - 1] if p > 0 else None
+            a = route[p]
+            b = route[p + 1] if p + 1 < len(route) else None
+            after = route[p + 2] if p + 2 < len(route) else None
+            cost = matrix[a][stop]
+            turns_delta = right(before, a, stop) - right(before, a, b) + right(a, stop, b)
+            if b is not None:
+                cost += matrix[stop][b] - matrix[a][b]
+                turns_delta += right(stop, b, after) - right(a, b, after)
+            cost += right_turn_penalty * turns_delta
+            if cost < best_cost:
+                best_cost, best_position = cost, p + 1
+        route.insert(best_position, stop)
+    
+    return route
+
+def solve_route(
+    coords: List[Tuple[float, float]],
+    matrix: np.ndarray,
+    right_turn_penalty: float = 500,
+    local_search_time_limit_ms: float = 0,
+    exact_max_stops: int = 0,
+    exact_time_limit_ms: Optional[float] = None,
+    exact_max_bytes: int = EXACT_MAX_BYTES,
+    time_limit_ms: Optional[float] = None,
+    seed: int = 0,
+    construction: str = "nearest_neighbor",
+    candidate_neighbours: int = 0
+) -> List[int]:
+    """Exact solve for routes of up to exact_max_stops stops, otherwise nearest-neighbour
+    construction followed by local search when a time budget is given
+    
+    Routes whose exact solve hits the memory or time bound fall back to the heuristic.
+    With time_limit_ms the whole solve runs in anytime mode: the exact solver gets at
+    most EXACT_BUDGET_SHARE of the budget, and is skipped when it is not expected to
+    finish within it. The nearest-neighbour route is then improved by iterated local
+    search until the budget is spent, or to a local optimum when none is left. A nonzero
+    seed randomizes the nearest-neighbour construction, for multi-start solving.
+    construction="hilbert" builds the initial route from the Hilbert curve instead.
+    With candidate_neighbours, routes above CANDIDATE_LISTS_MIN_STOPS restrict local
+    search to moves towards each stop's candidate_neighbours cheapest neighbours.
+    """
+    started = time.perf_counter()
+    turns = get_turn_table(coords)
+    exact_sized = len(coords) <= exact_max_stops
+    if exact_sized and time_limit_ms is not None:
+        share_ms = time_limit_ms * EXACT_BUDGET_SHARE
+        exact_time_limit_ms = min(exact_time_limit_ms or share_ms, share_ms)
+        exact_sized = exact_time_estimate_ms(len(coords)) <= exact_time_limit_ms
+    if exact_sized:
+        order = solve_exact_with_right_turn_penalty(
+            coords, matrix, right_turn_penalty, exact_time_limit_ms, exact_max_bytes, turns
+        )
+        if order is not None:
+            return order
+    
+    if construction == "hilbert":
+        order = solve_hilbert(coords)
+    else:
+        noise = MULTI_START_NOISE if seed else 0.0
+        order = solve_tsp_nearest_neighbor_with_right_turn_penalty(coords, matrix, right_turn_penalty, turns, noise, seed)
+    neighbours = None
+    if candidate_neighbours > 0 and len(coords) > max(CANDIDATE_LISTS_MIN_STOPS, candidate_neighbours + 1):
+        neighbours = candidate_lists(matrix, candidate_neighbours)
+    
+    if time_limit_ms is not None:
+        remaining_ms = time_limit_ms - (time.perf_counter() - started) * 1000
+        if remaining_ms > 0:
+            order = iterated_local_search(
+                coords, matrix, order, right_turn_penalty, remaining_ms, seed, turns, neighbours
+            )
+        elif len(coords) <= exact_max_stops:
+            # Cheap at this size, and far better than the bare construction
+            order = improve_route(coords, matrix, order, right_turn_penalty, turns=turns, neighbours=neighbours)
+    elif local_search_time_limit_ms > 0:
+        order = improve_route(
+            coords, matrix, order, right_turn_penalty, local_search_time_limit_ms, turns=turns, neighbours=neighbours
+        )
+    return order
+
+# Cost noise of the randomized nearest-neighbour construction used by every start but the first
+MULTI_START_NOISE = 0.15
+
+class SharedMatrix:
+    """Distance matrix copied once into shared memory for solver worker processes
+    
+    Workers attach by name through spec instead of receiving a pickled copy of the
+    matrix with every task. Use as a context manager; the block is freed on exit.
+    """
+    
+    def __init__(self, matrix: np.ndarray):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+        np.ndarray(matrix.shape, dtype=np.float64, buffer=self._shm.buf)[:] = matrix
+        self.spec = (self._shm.name, matrix.shape)
+    
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+    
+    def __enter__(self) -> "SharedMatrix":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def solve_route_shared(
+    spec: Tuple[str, Tuple[int, int]],
+    coords: List[Tuple[float, float]],
+    seed: int,
+    **solve_kwargs
+) -> Tuple[float, List[int]]:
+    """One start of a multi-start solve in a worker: solve_route on a SharedMatrix by
+    spec, returning (cost, order) so the caller can keep the best start
+    """
+    name, shape = spec
+    try:
+        # The creating process owns the block; workers must not unlink it on exit
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track flag; spawned workers share the parent's resource
+        # tracker, so the parent's unlink still clears the registration
+        shm = shared_memory.SharedMemory(name=name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        order = solve_route(coords, matrix, seed=seed, **solve_kwargs)
+        cost = route_cost(coords, matrix, order, solve_kwargs.get("right_turn_penalty", 500))
+        del matrix
+    finally:
+        shm.close()
+    return cost, order
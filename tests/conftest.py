@@ -0,0 +1,18 @@
+import os
+import random
+import sys
+
+import numpy as np
+
+# The service modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_instance(n: int, seed: int, spread: float = 0.05, legs=(200, 3000)):
+    """Random stops within spread degrees of each other and an asymmetric distance
+    matrix drawn from legs, so reversed segments are priced on their reverse legs
+    """
+    rng = random.Random(seed)
+    coords = [(12.9 + rng.random() * spread, 77.5 + rng.random() * spread) for _ in range(n)]
+    matrix = np.array([[0.0 if i == j else rng.uniform(*legs) for j in range(n)] for i in range(n)])
+    return coords, matrix
@@ -0,0 +1,43 @@
+import itertools
+
+import pytest
+
+from conftest import random_instance
+from solver import exact_memory_bytes, get_turn_table, route_cost, solve_exact_with_right_turn_penalty
+
+
+def brute_force_cost(coords, matrix, penalty, end=None):
+    n = len(coords)
+    turns = get_turn_table(coords)
+    best = float("inf")
+    for rest in itertools.permutations(range(1, n)):
+        if end is not None and rest[-1] != end:
+            continue
+        best = min(best, route_cost(coords, matrix, [0, *rest], penalty, turns))
+    return best
+
+
+@pytest.mark.parametrize("n", [3, 5, 7, 8])
+@pytest.mark.parametrize("penalty", [0, 500, 2000])
+def test_exact_matches_brute_force(n, penalty):
+    coords, matrix = random_instance(n, seed=n * 31 + penalty)
+    order = solve_exact_with_right_turn_penalty(coords, matrix, penalty)
+    assert order[0] == 0 and sorted(order) == list(range(n))
+    cost = route_cost(coords, matrix, order, penalty)
+    # The DP accumulates in float32
+    assert cost == pytest.approx(brute_force_cost(coords, matrix, penalty), rel=1e-5)
+
+
+@pytest.mark.parametrize("n", [4, 6, 8])
+def test_exact_with_end_matches_brute_force(n):
+    coords, matrix = random_instance(n, seed=n)
+    for end in range(1, n):
+        order = solve_exact_with_right_turn_penalty(coords, matrix, 500, end=end)
+        assert order[0] == 0 and order[-1] == end and sorted(order) == list(range(n))
+        cost = route_cost(coords, matrix, order, 500)
+        assert cost == pytest.approx(brute_force_cost(coords, matrix, 500, end=end), rel=1e-5)
+
+
+def test_exact_gives_up_past_memory_bound():
+    coords, matrix = random_instance(8, seed=0)
+    assert solve_exact_with_right_turn_penalty(coords, matrix, 500, max_bytes=exact_memory_bytes(8) - 1) is None
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from conftest import random_instance
+from solver import (
+    _RouteEvaluator,
+    _apply_pieces,
+    _or_opt_pieces,
+    _two_opt_pieces,
+    get_turn_table,
+    route_cost,
+)
+
+
+def random_route(n: int, seed: int):
+    coords, matrix = random_instance(n, seed, spread=0.2, legs=(100, 5000))
+    order = [0] + random.Random(seed).sample(range(1, n), n - 1)
+    return coords, matrix, order
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_two_opt_pieces_cost_matches_full_rescoring(seed):
+    coords, matrix, order = random_route(12, seed)
+    turns = get_turn_table(coords)
+    evaluator = _RouteEvaluator(coords, matrix, order, 500, turns)
+    assert evaluator.cost == pytest.approx(route_cost(coords, matrix, order, 500, turns))
+
+    n = len(order)
+    for i in range(1, n - 1):
+        for j in range(i + 1, n):
+            pieces = _two_opt_pieces(n, i, j)
+            expected = route_cost(coords, matrix, _apply_pieces(order, pieces), 500, turns)
+            assert evaluator.pieces_cost(pieces) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_or_opt_pieces_cost_matches_full_rescoring(seed):
+    coords, matrix, order = random_route(12, seed)
+    turns = get_turn_table(coords)
+    evaluator = _RouteEvaluator(coords, matrix, order, 500, turns)
+
+    n = len(order)
+    for length in (1, 2, 3):
+        for i in range(1, n - length + 1):
+            end = i + length - 1
+            for k in range(n):
+                if i - 1 <= k <= end:
+                    continue
+                for reverse in (False, True):
+                    pieces = _or_opt_pieces(n, i, length, k, reverse)
+                    moved = _apply_pieces(order, pieces)
+                    assert sorted(moved) == list(range(n))
+                    expected = route_cost(coords, matrix, moved, 500, turns)
+                    assert evaluator.pieces_cost(pieces) == pytest.approx(expected)
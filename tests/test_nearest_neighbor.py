@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pytest
+
+from solver import calculate_angle, solve_tsp_nearest_neighbor_with_right_turn_penalty
+
+
+def reference_nearest_neighbor(coords, matrix, right_turn_penalty=500):
+    """The construction as it was before vectorization, kept as the oracle"""
+    n = len(matrix)
+    unvisited = set(range(1, n))
+    order = [0]
+    current = 0
+    prev = None
+
+    while unvisited:
+        min_cost = float('inf')
+        next_city = None
+
+        for city in unvisited:
+            cost = matrix[current][city]
+            if prev is not None:
+                angle = calculate_angle(coords[prev], coords[current], coords[city])
+                if -135 < angle < -45:
+                    cost += right_turn_penalty
+            if cost < min_cost:
+                min_cost = cost
+                next_city = city
+
+        order.append(next_city)
+        unvisited.remove(next_city)
+        prev = current
+        current = next_city
+
+    return order
+
+
+def instance(n: int, kind: str, rng: random.Random):
+    """Stops on a small integer grid (exact 45/90/135 degree turns and tied legs),
+    scattered over a city, or scattered with asymmetric legs
+    """
+    if kind == "grid":
+        coords = [(float(rng.randint(0, 6)), float(rng.randint(0, 6))) for _ in range(n)]
+        scale = 1
+    else:
+        coords = [(12.9 + rng.random() * 0.2, 77.5 + rng.random() * 0.2) for _ in range(n)]
+        scale = 111000
+    points = np.array(coords)
+    matrix = np.round(np.sqrt(((points[:, None] - points[None]) ** 2).sum(-1)) * scale)
+    if kind == "asymmetric":
+        matrix = matrix * (1 + 0.3 * np.random.default_rng(rng.randrange(2 ** 32)).random((n, n)))
+    np.fill_diagonal(matrix, 0)
+    return coords, matrix
+
+
+@pytest.mark.parametrize("kind", ["grid", "geo", "asymmetric"])
+@pytest.mark.parametrize("seed", range(40))
+def test_matches_reference_order(kind, seed):
+    rng = random.Random(seed)
+    coords, matrix = instance(rng.randint(2, 60), kind, rng)
+    penalty = rng.choice([0, 1, 3, 500])
+    expected = reference_nearest_neighbor(coords, matrix, penalty)
+    assert solve_tsp_nearest_neighbor_with_right_turn_penalty(coords, matrix, penalty) == expected
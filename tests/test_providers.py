@@ -0,0 +1,43 @@
+import random
+
+import numpy as np
+import pytest
+
+from providers import MATRIX_MAX_DESTINATIONS, MATRIX_MAX_ELEMENTS, MATRIX_MAX_ORIGINS, plan_missing_tiles
+
+
+def check_plan(missing: np.ndarray):
+    covered = np.zeros_like(missing)
+    tiles = plan_missing_tiles(missing)
+    for origins, destinations in tiles:
+        assert len(origins) <= MATRIX_MAX_ORIGINS and len(destinations) <= MATRIX_MAX_DESTINATIONS
+        assert len(origins) * len(destinations) <= MATRIX_MAX_ELEMENTS
+        # Never request a stop's distance to itself
+        assert not set(origins) & set(destinations)
+        covered[np.ix_(origins, destinations)] = True
+    assert not (missing & ~covered).any()
+    # Each missing pair is requested exactly once, and nothing else is
+    assert sum(len(origins) * len(destinations) for origins, destinations in tiles) == missing.sum()
+    return tiles
+
+
+@pytest.mark.parametrize("n", [2, 3, 10, 12, 37, 60])
+def test_cold_cache_plan_covers_off_diagonal_pairs(n):
+    tiles = check_plan(~np.eye(n, dtype=bool))
+    if n <= 10:
+        # One tile per origin within a block
+        assert len(tiles) == n
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_partial_cache_plan_covers_missing_pairs(seed):
+    rng = random.Random(seed)
+    n = 30
+    missing = np.zeros((n, n), dtype=bool)
+    # Some new stops with no cached legs, plus scattered expired legs
+    for i in rng.sample(range(n), 4):
+        missing[i, :] = missing[:, i] = True
+    for _ in range(40):
+        missing[rng.randrange(n), rng.randrange(n)] = True
+    np.fill_diagonal(missing, False)
+    check_plan(missing)
@@ -0,0 +1,114 @@
+import heapq
+import math
+import random
+
+import numpy as np
+import pytest
+
+from road_graph import RoadGraph, build_road_graph, collapse_chains
+
+SIZE = 6
+SPACING_DEG = 0.004
+SHAPE_NODES = 2
+
+
+def synthetic_city(seed: int):
+    """SIZE x SIZE grid of intersections joined by ways with SHAPE_NODES shape nodes each
+
+    Inner east-west streets are one-way, alternating in direction, and every way has a
+    random speed so fastest routes are unique. Returns read_osm_pbf's arrays plus the
+    junction node ids, the nodes that survive chain collapsing.
+    """
+    rng = random.Random(seed)
+    lat, lng, tails, heads = [], [], [], []
+    speeds = []
+
+    def add_node(y, x):
+        lat.append(12.9 + y * SPACING_DEG)
+        lng.append(77.5 + x * SPACING_DEG)
+        return len(lat) - 1
+
+    intersections = [[add_node(r, c) for c in range(SIZE)] for r in range(SIZE)]
+
+    def add_way(a, b, direction):
+        (ya, xa), (yb, xb) = a, b
+        chain = [intersections[ya][xa]]
+        for k in range(1, SHAPE_NODES + 1):
+            t = k / (SHAPE_NODES + 1)
+            # Bend the way a little so shape nodes are not collinear
+            chain.append(add_node(ya + (yb - ya) * t + rng.uniform(-0.1, 0.1), xa + (xb - xa) * t + rng.uniform(-0.1, 0.1)))
+        chain.append(intersections[yb][xb])
+        speed = rng.uniform(20, 80)
+        for u, v in zip(chain, chain[1:]):
+            if direction >= 0:
+                tails.append(u), heads.append(v), speeds.append(speed)
+            if direction <= 0:
+                tails.append(v), heads.append(u), speeds.append(speed)
+
+    for r in range(SIZE):
+        for c in range(SIZE):
+            if c + 1 < SIZE:
+                one_way = 0 < r < SIZE - 1
+                add_way((r, c), (r, c + 1), (1 if r % 2 else -1) if one_way else 0)
+            if r + 1 < SIZE:
+                add_way((r, c), (r + 1, c), 0)
+
+    lat, lng = np.array(lat), np.array(lng)
+    tails, heads = np.array(tails, dtype=np.int64), np.array(heads, dtype=np.int64)
+    dist = 111320 * np.hypot(lat[tails] - lat[heads], (lng[tails] - lng[heads]) * math.cos(math.radians(12.9)))
+    time = dist / (np.array(speeds) / 3.6)
+    # Corners join only two ways, so they are collapsed like shape nodes
+    corners = {intersections[0][0], intersections[0][-1], intersections[-1][0], intersections[-1][-1]}
+    junctions = [node for row in intersections for node in row if node not in corners]
+    return lat, lng, tails, heads, dist, time, junctions
+
+
+def dijkstra(n, tails, heads, dist, time, source):
+    """Plain Dijkstra on travel time, tracking the distance of each fastest route"""
+    adjacency = [[] for _ in range(n)]
+    for u, v, d, t in zip(tails.tolist(), heads.tolist(), dist.tolist(), time.tolist()):
+        adjacency[u].append((v, d, t))
+    best_time = [math.inf] * n
+    best_dist = [math.inf] * n
+    best_time[source], best_dist[source] = 0.0, 0.0
+    heap = [(0.0, 0.0, source)]
+    while heap:
+        t, d, u = heapq.heappop(heap)
+        if t > best_time[u]:
+            continue
+        for v, leg_dist, leg_time in adjacency[u]:
+            if t + leg_time < best_time[v]:
+                best_time[v], best_dist[v] = t + leg_time, d + leg_dist
+                heapq.heappush(heap, (best_time[v], best_dist[v], v))
+    return np.array(best_dist), np.array(best_time)
+
+
+def test_collapse_keeps_only_junctions():
+    lat, lng, tails, heads, dist, time, junctions = synthetic_city(0)
+    collapsed = collapse_chains(lat, lng, tails, heads, dist, time)
+    assert len(collapsed[0]) == len(junctions)
+    assert sorted(zip(collapsed[0], collapsed[1])) == sorted(zip(lat[junctions], lng[junctions]))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_many_to_many_matches_dijkstra(tmp_path, seed):
+    lat, lng, tails, heads, dist, time, junctions = synthetic_city(seed)
+    build_road_graph(lat, lng, tails, heads, dist, time, str(tmp_path))
+    graph = RoadGraph(str(tmp_path))
+    assert graph.node_count == len(junctions)
+
+    coords = [(lat[i], lng[i]) for i in junctions]
+    distances, durations = graph.distance_matrix(coords)
+    # Upward edges hold float32 times and distances
+    for row, source in enumerate(junctions):
+        expected_dist, expected_time = dijkstra(len(lat), tails, heads, dist, time, source)
+        np.testing.assert_allclose(durations[row], expected_time[junctions], rtol=1e-6)
+        np.testing.assert_allclose(distances[row], expected_dist[junctions], rtol=1e-6)
+
+
+def test_stop_outside_graph_is_not_snapped(tmp_path):
+    lat, lng, tails, heads, dist, time, _ = synthetic_city(0)
+    build_road_graph(lat, lng, tails, heads, dist, time, str(tmp_path))
+    graph = RoadGraph(str(tmp_path))
+    assert graph.nearest_nodes([(12.9, 77.5), (13.9, 78.5)]) is None
+    assert graph.distance_matrix([(12.9, 77.5), (13.9, 78.5)]) is None
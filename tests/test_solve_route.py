@@ -0,0 +1,17 @@
+import pytest
+
+from conftest import random_instance
+from solver import route_cost, solve_route
+
+
+@pytest.mark.parametrize("n", [8, 12, 15])
+@pytest.mark.parametrize("time_limit_ms", [50, 200, 300])
+@pytest.mark.parametrize("seed", range(3))
+def test_budgeted_solve_never_worse_than_unbudgeted_heuristic(n, time_limit_ms, seed):
+    coords, matrix = random_instance(n, seed, spread=0.1, legs=(100, 3000))
+    heuristic = solve_route(coords, matrix, 500, local_search_time_limit_ms=5000)
+    budgeted = solve_route(
+        coords, matrix, 500, exact_max_stops=15, exact_time_limit_ms=2000, time_limit_ms=time_limit_ms, seed=seed
+    )
+    assert sorted(budgeted) == list(range(n)) and budgeted[0] == 0
+    assert route_cost(coords, matrix, budgeted, 500) <= route_cost(coords, matrix, heuristic, 500) + 1e-6